@@ -1,7 +1,13 @@
+import os
 import streamlit as st
-from src.tweet_nlp import convert_thought_to_genres
+from src.client import RecommenderClient
+from src.tweet_nlp import convert_thought_to_genres, warmup
 from src.recommend_engine import recommend_engine
 
+# Set RECOMMENDER_URL (e.g. http://127.0.0.1:8000) to use a running `python -m src.serve`
+# instead of loading the models inside this Streamlit process.
+SERVICE_URL = os.environ.get("RECOMMENDER_URL")
+
 # --- Page Configuration ---
 st.set_page_config(
     page_title="Thought to Title Recommender",
@@ -9,6 +15,33 @@ st.set_page_config(
     layout="centered"
 )
 
+# --- Shared Model ---
+@st.cache_resource(show_spinner="🧠 Loading the genre model...")
+def load_genre_classifier():
+    """Load the zero-shot classifier once per Streamlit worker."""
+    return warmup()
+
+
+@st.cache_resource
+def get_service_client():
+    """One HTTP client per Streamlit worker."""
+    return RecommenderClient(SERVICE_URL)
+
+
+def detect_genres(text):
+    """Return (genres, scores), locally or through the service."""
+    if SERVICE_URL:
+        return get_service_client().genres(text)
+    return convert_thought_to_genres(text, return_scores=True, classifier=load_genre_classifier())
+
+
+def get_recommendations(genre_scores, top_k, strict):
+    """Return titles, locally or through the service."""
+    if SERVICE_URL:
+        return get_service_client().recommend(genre_scores, top_k=top_k, strict=strict)
+    return recommend_engine(genre_scores, top_k=top_k, strict_genre_match=strict)
+
+
 # --- Custom CSS Styling ---
 st.markdown("""
 <style>
@@ -67,7 +100,7 @@ if st.button("🔍 Find My Movie", type="primary", use_container_width=True):
         with st.spinner("🧠 Analyzing your thought..."):
             try:
                 # 1. Extract genres using NLP
-                predicted_genres = convert_thought_to_genres(thought_text)
+                predicted_genres, genre_scores = detect_genres(thought_text)
                 
                 if predicted_genres and isinstance(predicted_genres, list) and len(predicted_genres) > 0:
                     # Display detected genres
@@ -78,11 +111,11 @@ if st.button("🔍 Find My Movie", type="primary", use_container_width=True):
                     
                     with st.spinner("🍿 Finding your perfect movie..."):
                         try:
-                            # 2. Get recommendations
-                            recommended_titles = recommend_engine(
-                                predicted_genres, 
+                            # 2. Get recommendations, weighting genres by confidence
+                            recommended_titles = get_recommendations(
+                                genre_scores, 
                                 top_k=top_k, 
-                                strict_genre_match=strict_match
+                                strict=strict_match
                             )
                             
                             if isinstance(recommended_titles, list) and len(recommended_titles) > 0:
@@ -0,0 +1,64 @@
+"""
+Import-cost check: light entry points must not pull in heavy dependencies.
+
+Each check runs in a fresh interpreter, so earlier imports cannot hide a
+regression. Exits with status 1 if a forbidden module shows up, and prints
+the `python -X importtime` cumulative time of each entry point.
+
+Usage:
+    python -m benchmarks.check_imports
+"""
+import json
+import os
+import re
+import subprocess
+import sys
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Statement -> modules that must stay out of sys.modules after running it
+CHECKS = {
+    'import src': ('torch', 'transformers', 'sklearn', 'pandas'),
+    'import src.recommend_engine': ('torch', 'transformers', 'sklearn', 'pandas'),
+    'import src.tweet_nlp': ('torch', 'transformers', 'sklearn'),
+    'import src.data_loader': ('torch', 'transformers', 'sklearn'),
+    'from src import recommend_engine; recommend_engine(["Action"], top_k=1)': ('torch', 'transformers', 'sklearn'),
+}
+
+
+def imported_modules(statement, modules):
+    """
+    Run statement in a fresh interpreter and return which of modules it
+    imported (also used by tests/test_imports.py).
+    """
+    code = f"import json, sys\n{statement}\nprint(json.dumps([m for m in {list(modules)!r} if m in sys.modules]))"
+    result = subprocess.run([sys.executable, '-c', code], cwd=project_root, capture_output=True, text=True)
+    if result.returncode:
+        raise RuntimeError(f"{statement!r} failed:\n{result.stderr}")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def import_time_ms(module):
+    """Cumulative import time of module as reported by -X importtime."""
+    stderr = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                            cwd=project_root, check=True, capture_output=True, text=True).stderr
+    match = re.search(rf'^import time:\s+\d+ \|\s+(\d+) \| {re.escape(module)}$', stderr, re.MULTILINE)
+    return int(match.group(1)) / 1000 if match else float('nan')
+
+
+def main():
+    failures = 0
+    for statement, forbidden in CHECKS.items():
+        found = imported_modules(statement, forbidden)
+        status = 'FAIL' if found else 'ok'
+        failures += bool(found)
+        print(f"{status:<5} {statement}" + (f"  (imported {', '.join(found)})" if found else ''))
+
+    print()
+    for module in ('src', 'src.recommend_engine', 'src.data_loader', 'src.tweet_nlp'):
+        print(f"{module:<24} {import_time_ms(module):>8.1f} ms  (-X importtime, cumulative)")
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,342 @@
+"""
+Offline benchmark suite for the thought-to-title pipeline.
+
+Uses the bundled MovieLens files and a deterministic fake in place of the
+Hugging Face model, so it runs without network access. Every artifact is
+built into a temporary directory; nothing under models/ or data/ changes.
+
+Usage:
+    python -m benchmarks.run                               # all suites
+    python -m benchmarks.run --suites recommend scale --scales 1 10
+    python -m benchmarks.run --output baseline.json         # store a baseline
+    python -m benchmarks.run --compare baseline.json        # flag regressions
+
+With --compare, the exit status is 1 if any benchmark's median got slower
+than the baseline by more than --tolerance (relative) and --min-delta-ms
+(absolute).
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+from src.build_model import build_model, save_model
+from src.data_loader import DEFAULT_MOVIES_PATH, load_and_preprocess_data, load_movies, load_ratings
+from src.item_index import ExactIndex
+from src.model_store import load_model
+from src.recommend_engine import GenreRecommender
+from src.tweet_nlp import convert_thought_to_genres
+from src.user_profiles import build_profiles
+from src.utils import get_top_n_similar
+
+from .fake_nlp import FakeZeroShotClassifier
+
+logger = logging.getLogger(__name__)
+
+SUITES = ('load', 'build', 'recommend', 'scale', 'similar', 'e2e')
+QUERIES = [
+    ['Action', 'Adventure'],
+    ['Comedy', 'Romance'],
+    ['Horror', 'Thriller', 'Mystery'],
+    ['Sci-Fi'],
+    ['Crime', 'Drama', 'Film-Noir'],
+]
+THOUGHTS = [
+    "I want to watch a movie about space travel and aliens.",
+    "Something funny and sweet about two people falling in love.",
+    "A tense psychological thriller with a shocking twist.",
+    "Martial arts action mixed with comedy.",
+    "A slow war drama about a family.",
+]
+
+
+def measure(fn, repeat=20, warmup=1):
+    """
+    Time fn() and summarise the wall-clock latencies.
+
+    Returns:
+        dict: median_ms, p95_ms, min_ms and runs.
+    """
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return {
+        'median_ms': round(float(np.median(samples)), 4),
+        'p95_ms': round(float(np.percentile(samples, 95)), 4),
+        'min_ms': round(float(np.min(samples)), 4),
+        'runs': repeat,
+    }
+
+
+def _cycle(items):
+    """Return a function that yields items round-robin, one per call."""
+    state = {'i': 0}
+
+    def next_item():
+        item = items[state['i'] % len(items)]
+        state['i'] += 1
+        return item
+    return next_item
+
+
+def bench_load(ctx):
+    cache_dir = os.path.join(ctx['tmp'], 'data_cache')
+    results = {
+        'load/csv': measure(lambda: load_and_preprocess_data(use_cache=False), ctx['repeat_slow'], warmup=0),
+    }
+    load_and_preprocess_data(cache_dir=cache_dir)  # writes the snapshot
+    results['load/snapshot'] = measure(lambda: load_and_preprocess_data(cache_dir=cache_dir), ctx['repeat_slow'])
+    return results
+
+
+def bench_build(ctx):
+    return {
+        'build/genres_only': measure(lambda: build_model(ratings_path=None, tags_path=None),
+                                     ctx['repeat_slow'], warmup=0),
+        'build/full': measure(lambda: build_model(), ctx['repeat_slow'], warmup=0),
+    }
+
+
+def _model_path(ctx):
+    """Build the full model once per run (artifact and legacy pickle) and share it between suites."""
+    if 'model_path' not in ctx:
+        model_components = build_model()
+        ctx['model_path'] = os.path.join(ctx['tmp'], 'model')
+        save_model(model_components, ctx['model_path'])
+        save_model(model_components, ctx['model_path'] + '.pkl')
+    return ctx['model_path']
+
+
+def bench_recommend(ctx):
+    model_path = _model_path(ctx)
+    results = {}
+    results['recommend/cold'] = measure(
+        lambda: GenreRecommender(model_path).recommend(QUERIES[0]), ctx['repeat_slow'], warmup=0)
+    results['recommend/cold_pickle'] = measure(
+        lambda: GenreRecommender(model_path + '.pkl').recommend(QUERIES[0]), ctx['repeat_slow'], warmup=0)
+
+    uncached = GenreRecommender(model_path, cache_size=0)
+    cached = GenreRecommender(model_path)
+    for top_k in (5, 50):
+        for strict in (True, False):
+            name = f"top{top_k}_{'strict' if strict else 'loose'}"
+            next_query = _cycle(QUERIES)
+            results[f'recommend/warm_{name}'] = measure(
+                lambda: uncached.recommend(next_query(), top_k=top_k, strict=strict), ctx['repeat'])
+            results[f'recommend/cached_{name}'] = measure(
+                lambda: cached.recommend(next_query(), top_k=top_k, strict=strict), ctx['repeat'],
+                warmup=len(QUERIES))
+    next_query = _cycle(QUERIES)
+    results['recommend/warm_hybrid'] = measure(
+        lambda: uncached.recommend(next_query(), scoring='hybrid'), ctx['repeat'])
+
+    # Personalised: affinity re-rank plus seen-title mask, cycling through users
+    ratings = load_ratings()
+    model_components = load_model(model_path)
+    profile_path = os.path.join(ctx['tmp'], 'profiles')
+    build_profiles(ratings, model_components).save(profile_path)
+    personalized = GenreRecommender(model_path, cache_size=0, profile_path=profile_path)
+    next_query = _cycle(QUERIES)
+    next_user = _cycle(list(np.unique(ratings['userId'].to_numpy())[:50]))
+    results['recommend/warm_personalized'] = measure(
+        lambda: personalized.recommend(next_query(), user_id=int(next_user())), ctx['repeat'])
+
+    # Folding 1% of the ratings into the store as new events vs a full rebuild
+    ordered = ratings.sort_values('timestamp')
+    split = len(ordered) - len(ordered) // 100
+    store = build_profiles(ordered.iloc[:split], model_components)
+    results['profiles/build'] = measure(lambda: build_profiles(ratings, model_components), ctx['repeat_slow'])
+    results['profiles/update_1pct'] = measure(
+        lambda: store.update(ordered.iloc[split:], model_components['normalized_matrix']), ctx['repeat_slow'])
+    return results
+
+
+def synthetic_catalog(scale, seed=0):
+    """
+    Movies table scale times the size of the bundled one.
+
+    Genre strings are sampled from the real catalogue, so the posting-list
+    length distribution matches MovieLens while the row count grows.
+    """
+    movies = load_movies(DEFAULT_MOVIES_PATH)
+    rng = np.random.default_rng(seed)
+    n = len(movies) * scale
+    genres = movies['genres'].astype(str).to_numpy()[rng.integers(0, len(movies), n)]
+    return pd.DataFrame({
+        'movieId': np.arange(n, dtype=np.int32),
+        'title': np.array([f"Synthetic movie {i}" for i in range(n)], dtype=object),
+        'genres': genres,
+    })
+
+
+def bench_scale(ctx):
+    results = {}
+    for scale in ctx['scales']:
+        movies = synthetic_catalog(scale)
+        vectorizer = TfidfVectorizer(token_pattern=r'[^|]+', lowercase=False)
+        genre_matrix = vectorizer.fit_transform(movies['genres']).astype(np.float32).tocsr()
+        model_path = os.path.join(ctx['tmp'], f'synthetic_x{scale}')
+        save_model({
+            'vectorizer': vectorizer,
+            'genre_matrix': genre_matrix,
+            'id_to_title': pd.Series(movies['title'].to_numpy()),
+            'movie_ids': movies['movieId'].to_numpy(),
+            # Random CF factors, so hybrid scoring exercises the per-row path
+            'item_factors': np.random.default_rng(scale).standard_normal((len(movies), 32), dtype=np.float32),
+        }, model_path)
+
+        prefix = f'scale_x{scale}'
+        results[f'{prefix}/load'] = measure(lambda: GenreRecommender(model_path), ctx['repeat_slow'], warmup=0)
+        recommender = GenreRecommender(model_path, cache_size=0)
+        for strict in (True, False):
+            next_query = _cycle(QUERIES)
+            results[f"{prefix}/recommend_{'strict' if strict else 'loose'}"] = measure(
+                lambda: recommender.recommend(next_query(), top_k=10, strict=strict), ctx['repeat'])
+        next_query = _cycle(QUERIES)
+        results[f'{prefix}/recommend_hybrid'] = measure(
+            lambda: recommender.recommend(next_query(), top_k=10, scoring='hybrid'), ctx['repeat'])
+
+        query, _ = recommender.build_query(QUERIES[0])
+        index = ExactIndex(genre_matrix)
+        results[f'{prefix}/top_n_similar_prebuilt'] = measure(
+            lambda: get_top_n_similar(query, genre_matrix, movies, n=10, index=index), ctx['repeat'])
+    return results
+
+
+def bench_similar(ctx):
+    model_components = load_model(_model_path(ctx))
+    vectors = model_components['content_matrix']
+    movie_df = pd.DataFrame({'title': list(model_components['titles'])})
+    index = ExactIndex(vectors)
+    queries = [vectors[i] for i in range(0, vectors.shape[0], max(1, vectors.shape[0] // 20))]
+    next_vector = _cycle(queries)
+    return {
+        'similar/top10_unindexed': measure(
+            lambda: get_top_n_similar(next_vector(), vectors, movie_df, n=10), ctx['repeat']),
+        'similar/top10_prebuilt': measure(
+            lambda: get_top_n_similar(next_vector(), vectors, movie_df, n=10, index=index), ctx['repeat']),
+    }
+
+
+def bench_e2e(ctx):
+    classifier = FakeZeroShotClassifier()
+    recommender = GenreRecommender(_model_path(ctx), cache_size=0)
+    next_thought = _cycle(THOUGHTS)
+
+    def thought_to_titles():
+        _, scores = convert_thought_to_genres(next_thought(), return_scores=True, classifier=classifier)
+        return recommender.recommend(scores, top_k=5)
+
+    return {
+        'e2e/nlp_fake': measure(
+            lambda: convert_thought_to_genres(next_thought(), classifier=classifier), ctx['repeat']),
+        'e2e/thought_to_titles': measure(thought_to_titles, ctx['repeat']),
+    }
+
+
+BENCHMARKS = {
+    'load': bench_load,
+    'build': bench_build,
+    'recommend': bench_recommend,
+    'scale': bench_scale,
+    'similar': bench_similar,
+    'e2e': bench_e2e,
+}
+
+
+def compare(results, baseline, tolerance=0.2, min_delta_ms=0.05):
+    """
+    Compare medians with a baseline run.
+
+    A benchmark regresses when its median is more than tolerance slower
+    (relative) and min_delta_ms slower (absolute), so sub-microsecond noise
+    on very fast benchmarks is not flagged.
+
+    Returns:
+        list: (name, baseline_ms, current_ms, ratio, regressed) for every
+        benchmark present in both runs.
+    """
+    rows = []
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if previous is None:
+            continue
+        before, after = previous['median_ms'], current['median_ms']
+        ratio = after / before if before else float('inf')
+        regressed = ratio > 1.0 + tolerance and after - before > min_delta_ms
+        rows.append((name, before, after, ratio, regressed))
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the offline benchmark suite.")
+    parser.add_argument('--suites', nargs='+', choices=SUITES, default=list(SUITES))
+    parser.add_argument('--scales', nargs='+', type=int, default=[1, 10, 100],
+                        help="Synthetic catalogue multipliers for the scale suite")
+    parser.add_argument('--repeat', type=int, default=200, help="Runs per fast benchmark")
+    parser.add_argument('--repeat-slow', type=int, default=3, help="Runs per load/build benchmark")
+    parser.add_argument('--output', help="Write results to this JSON file")
+    parser.add_argument('--compare', metavar='BASELINE', help="Baseline JSON to compare against")
+    parser.add_argument('--tolerance', type=float, default=0.2, help="Allowed relative slowdown")
+    parser.add_argument('--min-delta-ms', type=float, default=0.05, help="Ignore slowdowns smaller than this")
+    args = parser.parse_args(argv)
+
+    # Per-call INFO logs would dominate sub-millisecond timings
+    logging.getLogger('src').setLevel(logging.WARNING)
+
+    results = {}
+    with tempfile.TemporaryDirectory(prefix='bench-') as tmp:
+        ctx = {'tmp': tmp, 'repeat': args.repeat, 'repeat_slow': args.repeat_slow, 'scales': args.scales}
+        for suite in args.suites:
+            start = time.perf_counter()
+            results.update(BENCHMARKS[suite](ctx))
+            print(f"[{suite}] done in {time.perf_counter() - start:.1f}s", file=sys.stderr)
+
+    print(f"{'benchmark':<44} {'median ms':>10} {'p95 ms':>10} {'min ms':>10}")
+    for name, stats in results.items():
+        print(f"{name:<44} {stats['median_ms']:>10.3f} {stats['p95_ms']:>10.3f} {stats['min_ms']:>10.3f}")
+
+    report = {
+        'meta': {
+            'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+        },
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nResults written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)['results']
+        rows = compare(results, baseline, args.tolerance, args.min_delta_ms)
+        print(f"\n{'benchmark':<44} {'baseline':>10} {'current':>10} {'ratio':>7}")
+        for name, before, after, ratio, regressed in rows:
+            print(f"{name:<44} {before:>10.3f} {after:>10.3f} {ratio:>6.2f}x{'  REGRESSION' if regressed else ''}")
+        regressions = [row for row in rows if row[4]]
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) beyond {args.tolerance:.0%}")
+            return 1
+        print("\nNo regressions")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,40 +1,153 @@
 # diagnose_nlp.py
-from transformers import pipeline
+"""
+Smoke test and CPU benchmark harness for the genre classifier.
+
+Loads one or more classifier configurations, times them on a fixed set of
+thoughts and compares their predicted genres with the first (reference)
+configuration, so the speed/accuracy trade-off can be picked with data.
+
+Usage:
+    python diagnose_nlp.py
+    python diagnose_nlp.py --models facebook/bart-large-mnli ./models/distilbart-mnli \
+        --quantize both --threads 4 --runs 5 --json nlp_report.json
+"""
+import argparse
+import gc
+import json
 import os
+import sys
+import time
+
+import numpy as np
 
 # This helps prevent some network errors on certain systems
 os.environ['CURL_CA_BUNDLE'] = ''
 
-print("Attempting to initialize the NLP pipeline...")
-print("This may take a while as it will download a 1.6 GB model if not cached.")
-
-try:
-    # Initialize the classifier
-    classifier = pipeline("zero-shot-classification",
-                          model="facebook/bart-large-mnli")
-
-    print("\nModel initialized successfully!")
-
-    # Define a simple thought and the candidate genres
-    thought_text = "I want to watch a movie about space travel and aliens."
-    candidate_genres = [
-        'Action', 'Adventure', 'Animation', 'Comedy', 'Crime', 'Documentary',
-        'Drama', 'Fantasy', 'History', 'Horror', 'Mystery', 'Romance',
-        'Sci-Fi', 'Thriller', 'War', 'Western'
-    ]
-
-    # Get the raw results from the model
-    results = classifier(thought_text, candidate_genres)
-
-    # Print the full, unfiltered results
-    print("\n--- RAW MODEL OUTPUT ---")
-    print(f"Thought: '{results['sequence']}'")
-    for i in range(len(results['labels'])):
-        label = results['labels'][i]
-        score = results['scores'][i]
-        print(f"{label}: {score:.4f}")
-
-except Exception as e:
-    print(f"\n--- AN ERROR OCCURRED ---")
-    print("The process failed. This is likely a network issue or a problem with the installation.")
-    print(f"Error details: {e}")
\ No newline at end of file
+SAMPLE_THOUGHTS = [
+    "I want to watch a movie about space travel and aliens.",
+    "I want to see something with spaceships, laser battles, and a lone hero fighting against a galactic empire.",
+    "I'm in the mood for something funny and sweet, maybe about two people falling in love against the odds.",
+    "I want to watch a movie that will keep me on the edge of my seat, with a shocking twist at the end and maybe a ghost.",
+    "I want to see martial arts action mixed with comedy, like kung fu but hilarious.",
+    "I'm looking for a mockumentary style comedy about everyday office life.",
+    "Something about a crew pulling off an impossible bank robbery.",
+    "A slow, sad story about a family during the war.",
+]
+
+
+def current_rss_mb():
+    """
+    Resident set size of this process in MB (Linux /proc, else peak RSS).
+
+    Returns None where neither is available (e.g. Windows).
+    """
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2 ** 20
+    except (OSError, AttributeError):
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2 ** 20 if sys.platform == 'darwin' else peak / 1024
+
+
+def jaccard(a, b):
+    a, b = set(a), set(b)
+    return len(a & b) / len(a | b) if a | b else 1.0
+
+
+def benchmark(model_name, quantize, runs, threshold, mode):
+    """Load one configuration and time it on SAMPLE_THOUGHTS."""
+    from src.tweet_nlp import convert_thought_to_genres, get_classifier, unload
+
+    unload()
+    gc.collect()
+    rss_before = current_rss_mb()
+    start = time.perf_counter()
+    classifier = get_classifier(model_name, device=-1, quantize=quantize)
+    load_s = time.perf_counter() - start
+    rss_loaded = current_rss_mb()
+
+    # First call primes caches (and the label index in embedding mode)
+    convert_thought_to_genres(SAMPLE_THOUGHTS[0], threshold, classifier=classifier, mode=mode)
+
+    latencies, predictions = [], []
+    for _ in range(runs):
+        for text in SAMPLE_THOUGHTS:
+            start = time.perf_counter()
+            genres = convert_thought_to_genres(text, threshold, classifier=classifier, mode=mode)
+            latencies.append((time.perf_counter() - start) * 1000)
+            if len(predictions) < len(SAMPLE_THOUGHTS):
+                predictions.append(genres)
+
+    return {
+        'model': model_name,
+        'quantize': quantize,
+        'mode': mode,
+        'load_s': round(load_s, 2),
+        'rss_mb': round(rss_loaded - rss_before, 1) if rss_before is not None else None,
+        'p50_ms': round(float(np.percentile(latencies, 50)), 1),
+        'p95_ms': round(float(np.percentile(latencies, 95)), 1),
+        'predictions': predictions,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark genre classifier configurations on CPU.")
+    parser.add_argument('--models', nargs='+', default=None,
+                        help="Model ids or local checkpoint paths (first one is the reference)")
+    parser.add_argument('--quantize', choices=['off', 'on', 'both'], default='off',
+                        help="Benchmark full precision, int8 dynamic quantization, or both")
+    parser.add_argument('--mode', choices=['nli', 'embedding', 'both'], default='nli')
+    parser.add_argument('--threads', type=int, default=None, help="torch intra-op threads")
+    parser.add_argument('--runs', type=int, default=3, help="Passes over the sample thoughts")
+    parser.add_argument('--threshold', type=float, default=None,
+                        help="Genre inclusion threshold (default: per mode, see DEFAULT_THRESHOLDS)")
+    parser.add_argument('--json', help="Also write the report to this file")
+    args = parser.parse_args(argv)
+
+    print("Attempting to initialize the NLP pipeline...")
+    print("This may take a while as it will download a 1.6 GB model if not cached.")
+
+    try:
+        from src.tweet_nlp import DEFAULT_MODEL_NAME, configure_threads
+        threads = configure_threads(args.threads)
+        models = args.models or [DEFAULT_MODEL_NAME]
+        quantize_options = {'off': [False], 'on': [True], 'both': [False, True]}[args.quantize]
+        modes = ['nli', 'embedding'] if args.mode == 'both' else [args.mode]
+
+        results = [benchmark(model, quantize, args.runs, args.threshold, mode)
+                   for model in models for quantize in quantize_options for mode in modes]
+    except Exception as e:
+        print(f"\n--- AN ERROR OCCURRED ---")
+        print("The process failed. This is likely a network issue or a problem with the installation.")
+        print(f"Error details: {e}")
+        return 1
+
+    # Label agreement against the first configuration (full precision reference)
+    reference = results[0]['predictions']
+    for result in results:
+        pairs = list(zip(reference, result['predictions']))
+        result['top1_agreement'] = round(float(np.mean([bool(r) and bool(p) and r[0] == p[0] for r, p in pairs])), 3)
+        result['jaccard'] = round(float(np.mean([jaccard(r, p) for r, p in pairs])), 3)
+
+    print(f"\n--- CPU BENCHMARK ({threads} threads, {len(SAMPLE_THOUGHTS)} thoughts x {args.runs} runs) ---")
+    header = f"{'model':<40} {'int8':<5} {'mode':<9} {'load s':>7} {'RSS MB':>8} {'p50 ms':>8} {'p95 ms':>8} {'top1':>6} {'jacc':>6}"
+    print(header)
+    print('-' * len(header))
+    for r in results:
+        print(f"{r['model'][-40:]:<40} {str(r['quantize']):<5} {r['mode']:<9} {r['load_s']:>7} {str(r['rss_mb']):>8} "
+              f"{r['p50_ms']:>8} {r['p95_ms']:>8} {r['top1_agreement']:>6} {r['jaccard']:>6}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'threads': threads, 'thoughts': SAMPLE_THOUGHTS, 'results': results}, f, indent=2)
+        print(f"\nReport written to {args.json}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,7 +1,53 @@
-from .data_loader import load_and_preprocess_data
-from .recommend_engine import recommend_engine
-from .tweet_nlp import convert_thought_to_genres
-from .utils import get_top_n_similar  # have any helper functions
+"""
+Thought-to-title recommender.
+
+Every public name is resolved on first attribute access (PEP 562), so
+`import src` loads no submodule: neither the heavy dependencies (pandas,
+torch, transformers) nor the modules behind the `python -m src.<module>`
+CLIs, which runpy would otherwise execute a second time as __main__.
+
+`recommend_engine` is both a submodule and the function exported here. The
+package attribute always holds the function: importing the submodule
+(`import src.recommend_engine`) would otherwise rebind it to the module.
+"""
+import importlib
+import sys
+import types
 
 # Optionally: expose a version or default paths
 __version__ = '0.1'
+
+# Public name -> submodule that defines it
+_LAZY_ATTRIBUTES = {
+    'load_and_preprocess_data': 'data_loader',
+    'recommend_engine': 'recommend_engine',
+    'convert_thought_to_genres': 'tweet_nlp',
+    'get_top_n_similar': 'utils',  # have any helper functions
+}
+
+__all__ = ['load_and_preprocess_data', 'recommend_engine', 'convert_thought_to_genres', 'get_top_n_similar']
+
+
+def __getattr__(name):
+    module_name = _LAZY_ATTRIBUTES.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f'.{module_name}', __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_ATTRIBUTES))
+
+
+class _Package(types.ModuleType):
+    def __setattr__(self, name, value):
+        # The import system binds each loaded submodule onto its package;
+        # keep the recommend_engine() function in place of its module
+        if name == 'recommend_engine' and isinstance(value, types.ModuleType):
+            value = value.recommend_engine
+        super().__setattr__(name, value)
+
+
+sys.modules[__name__].__class__ = _Package
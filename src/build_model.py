@@ -0,0 +1,188 @@
+"""
+Build the genre-to-title model used by recommend_engine.
+
+Usage:
+    python -m src.build_model [--movies data/movies.csv] [--ratings data/ratings.csv]
+                              [--tags data/tags.csv] [--output models/genre_to_title_model]
+
+The model is written as an artifact directory (see src.model_store); an
+--output path ending in .pkl writes a legacy pickle instead.
+
+    # Patch an existing model with newly applied tags, without a rebuild
+    python -m src.build_model --update-tags new_tags.csv
+"""
+import argparse
+import logging
+import os
+import pickle
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+from .collaborative import build_rating_matrix, train_svd
+from .content_model import TagContentModel
+from .data_loader import (DEFAULT_MOVIES_PATH, DEFAULT_RATINGS_PATH, DEFAULT_TAGS_PATH,
+                          load_movies, load_ratings, load_tags)
+from .model_store import current_version, load_model, save_artifact
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+MODEL_FORMAT_VERSION = 2
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(script_dir)
+DEFAULT_OUTPUT_PATH = os.path.join(project_root, 'models', 'genre_to_title_model')
+
+
+def compute_popularity(ratings, movie_ids):
+    """
+    Aggregate rating count and mean rating per movie.
+
+    Args:
+        ratings (pd.DataFrame): Ratings with movieId and rating columns.
+        movie_ids (np.ndarray): movieIds in model row order.
+
+    Returns:
+        dict: 'rating_count' (int32) and 'rating_mean' (float32) arrays aligned with movie_ids.
+    """
+    stats = ratings.groupby('movieId')['rating'].agg(['count', 'mean']).reindex(movie_ids)
+    return {
+        'rating_count': stats['count'].fillna(0).to_numpy(dtype=np.int32),
+        'rating_mean': stats['mean'].fillna(0).to_numpy(dtype=np.float32),
+    }
+
+
+def build_model(movies_path=DEFAULT_MOVIES_PATH, ratings_path=DEFAULT_RATINGS_PATH, factors=32,
+                tags_path=DEFAULT_TAGS_PATH, ratings=None):
+    """
+    Build the model components with exactly one row per movieId.
+
+    Args:
+        movies_path (str): Path to movies.csv.
+        ratings_path (str): Path to ratings.csv (used for popularity stats only).
+            Pass None to skip the popularity columns and item factors.
+        factors (int): Number of collaborative-filtering item factors to
+            train from the ratings (0 disables them).
+        tags_path (str): Path to tags.csv for the genre+tag content matrix.
+            Pass None (or a missing file) to skip it.
+        ratings (pd.DataFrame): Already-loaded ratings to use instead of
+            reading ratings_path (e.g. the training side of a split).
+
+    Returns:
+        dict: Model components keyed the way recommend_engine reads them.
+    """
+    movies = load_movies(movies_path).drop_duplicates('movieId').reset_index(drop=True)
+
+    # Each pipe-separated genre is one feature, e.g. "Sci-Fi" or "Film-Noir"
+    vectorizer = TfidfVectorizer(token_pattern=r'[^|]+', lowercase=False)
+    genre_matrix = vectorizer.fit_transform(movies['genres'].astype(str)).astype(np.float32)
+
+    movie_ids = movies['movieId'].to_numpy()
+    model_components = {
+        'format_version': MODEL_FORMAT_VERSION,
+        'built_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'vectorizer': vectorizer,
+        'genre_matrix': genre_matrix.tocsr(),
+        'id_to_title': pd.Series(movies['title'].to_numpy(dtype=object), index=movies.index),
+        'movie_ids': movie_ids,
+    }
+
+    if ratings is None and ratings_path:
+        ratings = load_ratings(ratings_path)
+    if ratings is not None:
+        model_components['popularity'] = compute_popularity(ratings, movie_ids)
+        if factors:
+            rating_matrix, _ = build_rating_matrix(ratings, movie_ids)
+            model_components['item_factors'] = train_svd(rating_matrix, factors)['item_factors']
+            model_components['cf_params'] = {'method': 'svd', 'factors': factors}
+
+    if tags_path and os.path.exists(tags_path):
+        content_model = TagContentModel(movie_ids, genre_matrix).fit(load_tags(tags_path))
+        model_components.update(content_model.to_components())
+
+    return model_components
+
+
+def update_tags(model_path, new_tags_path):
+    """
+    Fold newly applied tags into an existing model artifact in place.
+
+    Only the content rows of movies that received new tags are recomputed.
+
+    Returns:
+        int: Number of movies whose content vector changed.
+    """
+    if model_path.endswith('.pkl'):
+        with open(model_path, 'rb') as f:
+            model_components = pickle.load(f)
+    else:
+        # Read into memory: the artifact being patched is replaced on save
+        model_components = load_model(model_path, mmap_mode=None)
+    if 'tag_counts' in model_components:
+        content_model = TagContentModel.from_components(model_components)
+    elif model_components.get('movie_ids') is None:
+        raise ValueError(f"{model_path} has no movie ids (converted from an old pickle?); "
+                         f"rebuild it with `python -m src.build_model`")
+    else:
+        content_model = TagContentModel(model_components['movie_ids'], model_components['genre_matrix'])
+
+    affected = content_model.update(load_tags(new_tags_path))
+    model_components.update(content_model.to_components())
+    save_model(model_components, model_path)
+    return len(affected)
+
+
+def save_model(model_components, output_path=DEFAULT_OUTPUT_PATH):
+    """
+    Write the model components to output_path, replacing it only once complete.
+
+    Paths ending in .pkl get a legacy pickle; anything else an artifact
+    directory (see src.model_store.save_artifact).
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    if not output_path.endswith('.pkl'):
+        save_artifact(model_components, output_path)
+        return
+    tmp_path = output_path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        pickle.dump(model_components, f, protocol=pickle.HIGHEST_PROTOCOL)
+    # Atomic swap so a running GenreRecommender never reads a half-written file
+    os.replace(tmp_path, output_path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build the genre-to-title recommender model.")
+    parser.add_argument('--movies', default=DEFAULT_MOVIES_PATH, help="Path to movies.csv")
+    parser.add_argument('--ratings', default=DEFAULT_RATINGS_PATH, help="Path to ratings.csv")
+    parser.add_argument('--output', default=DEFAULT_OUTPUT_PATH, help="Where to write the model")
+    parser.add_argument('--factors', type=int, default=32,
+                        help="Collaborative-filtering factors to train (0 disables)")
+    parser.add_argument('--tags', default=DEFAULT_TAGS_PATH, help="Path to tags.csv")
+    parser.add_argument('--update-tags', metavar='TAGS_CSV',
+                        help="Patch the model at --output with these new tags instead of rebuilding")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    if args.update_tags:
+        changed = update_tags(args.output, args.update_tags)
+        logger.info(f"Patched {changed} movies in {args.output} in {time.perf_counter() - start:.2f}s")
+        return
+
+    model_components = build_model(args.movies, args.ratings, args.factors, args.tags)
+    save_model(model_components, args.output)
+    elapsed = time.perf_counter() - start
+
+    rows, features = model_components['genre_matrix'].shape
+    if os.path.isdir(args.output):
+        size_kb = sum(entry.stat().st_size for entry in os.scandir(current_version(args.output))) / 1024
+    else:
+        size_kb = os.path.getsize(args.output) / 1024
+    logger.info(f"Built {rows} movies x {features} genres in {elapsed:.2f}s "
+                f"-> {args.output} ({size_kb:.0f} KB, format v{MODEL_FORMAT_VERSION})")
+
+
+if __name__ == '__main__':
+    main()
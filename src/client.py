@@ -0,0 +1,47 @@
+import json
+import urllib.error
+import urllib.request
+
+
+class RecommenderClient:
+    """
+    Minimal JSON client for the src.serve HTTP service.
+
+    Args:
+        base_url (str): Service root, e.g. "http://127.0.0.1:8000".
+        timeout (float): Socket timeout in seconds.
+    """
+
+    def __init__(self, base_url, timeout=30.0):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+
+    def _post(self, path, payload):
+        data = json.dumps(payload).encode('utf-8')
+        req = urllib.request.Request(self.base_url + path, data=data,
+                                     headers={'Content-Type': 'application/json'})
+        try:
+            with urllib.request.urlopen(req, timeout=self.timeout) as response:
+                return json.loads(response.read())
+        except urllib.error.HTTPError as e:
+            try:
+                message = json.loads(e.read()).get('error', e.reason)
+            except ValueError:
+                message = e.reason
+            raise RuntimeError(f"{path} failed ({e.code}): {message}") from e
+
+    def genres(self, text, threshold=0.3):
+        """Return (genres, scores) for a thought."""
+        body = self._post('/genres', {'text': text, 'threshold': threshold})
+        return body['genres'], body['scores']
+
+    def recommend(self, genres, top_k=5, strict=True, scoring='genre', user_id=None):
+        """Return titles for a genre list or a genre: score mapping."""
+        body = self._post('/recommend', {'genres': genres, 'top_k': top_k,
+                                         'strict': strict, 'scoring': scoring, 'user_id': user_id})
+        return body['titles']
+
+    def thought_to_titles(self, text, threshold=0.3, top_k=5, strict=True, scoring='genre', user_id=None):
+        """Run the whole pipeline server-side; returns the response body."""
+        return self._post('/thought-to-titles', {'text': text, 'threshold': threshold, 'top_k': top_k,
+                                                 'strict': strict, 'scoring': scoring, 'user_id': user_id})
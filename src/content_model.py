@@ -0,0 +1,127 @@
+import logging
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from sklearn.feature_extraction.text import HashingVectorizer
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TAG_FEATURES = 2 ** 18
+DEFAULT_TAG_WEIGHT = 0.5
+
+
+def _l2_normalize(matrix):
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    norms[norms == 0] = 1.0
+    return sparse.csr_matrix(matrix.multiply(1.0 / norms[:, None]), dtype=np.float32)
+
+
+class TagContentModel:
+    """
+    Genre + free-text tag content vectors, one row per movie.
+
+    Tags are hashed into a fixed feature space (HashingVectorizer), so new
+    tags never force a refit. Raw per-movie tag counts are kept, and an
+    incremental update() only recomputes the rows of movies that received
+    new tags.
+
+    Args:
+        movie_ids (np.ndarray): movieIds in model row order.
+        genre_matrix (scipy.sparse matrix): Genre rows aligned with movie_ids.
+        tag_counts (scipy.sparse matrix): Existing raw tag counts (None starts empty).
+        n_features (int): Size of the hashed tag space.
+        tag_weight (float): Share of the tag block in the combined vector.
+    """
+
+    def __init__(self, movie_ids, genre_matrix, tag_counts=None,
+                 n_features=DEFAULT_TAG_FEATURES, tag_weight=DEFAULT_TAG_WEIGHT):
+        self.movie_index = pd.Index(movie_ids)
+        self.n_features = n_features
+        self.tag_weight = tag_weight
+        # Unigrams and bigrams, so "dark comedy" also counts as a phrase
+        self.vectorizer = HashingVectorizer(n_features=n_features, ngram_range=(1, 2),
+                                            alternate_sign=False, norm=None)
+        self._genre_rows = _l2_normalize(sparse.csr_matrix(genre_matrix)) * np.float32(np.sqrt(1.0 - tag_weight))
+        if tag_counts is None:
+            tag_counts = sparse.csr_matrix((len(movie_ids), n_features), dtype=np.float32)
+        self.tag_counts = sparse.csr_matrix(tag_counts, dtype=np.float32)
+        self.content_matrix = self._combine(np.arange(len(movie_ids)))
+
+    @classmethod
+    def from_components(cls, model_components):
+        """Rebuild the content model from a saved model artifact."""
+        params = model_components['content_params']
+        return cls(model_components['movie_ids'], model_components['genre_matrix'],
+                   tag_counts=model_components['tag_counts'], **params)
+
+    def to_components(self):
+        """Arrays to store in the model artifact."""
+        return {
+            'tag_counts': self.tag_counts,
+            'content_matrix': self.content_matrix,
+            'content_params': {'n_features': self.n_features, 'tag_weight': self.tag_weight},
+        }
+
+    def _hash_tags(self, tags_df):
+        """
+        Hash tag rows and sum them per movie.
+
+        Returns:
+            tuple: (sorted affected row indices, csr delta of shape (n_movies, n_features))
+        """
+        rows = self.movie_index.get_indexer(tags_df['movieId'].to_numpy())
+        known = rows >= 0
+        if not known.all():
+            logger.warning(f"Skipping {int((~known).sum())} tags for movies not in the model")
+        rows = rows[known]
+        hashed = self.vectorizer.transform(tags_df['tag'].astype(str).to_numpy()[known])
+
+        # Movie x tag-row indicator: one sparse matmul sums every tag into its movie
+        indicator = sparse.csr_matrix(
+            (np.ones(len(rows), dtype=np.float32), (rows, np.arange(len(rows)))),
+            shape=(len(self.movie_index), len(rows)),
+        )
+        return np.unique(rows), (indicator @ hashed).astype(np.float32).tocsr()
+
+    def _combine(self, rows):
+        """Combined, L2-normalised content vectors for the given rows."""
+        # Sublinear tf damps tags that many users applied to the same movie
+        tag_rows = self.tag_counts[rows]
+        tag_rows.data = np.log1p(tag_rows.data)
+        tag_rows = _l2_normalize(tag_rows) * np.float32(np.sqrt(self.tag_weight))
+        return _l2_normalize(sparse.hstack([self._genre_rows[rows], tag_rows], format='csr'))
+
+    def fit(self, tags_df):
+        """Replace all tag counts with the ones aggregated from tags_df."""
+        _, self.tag_counts = self._hash_tags(tags_df)
+        self.content_matrix = self._combine(np.arange(len(self.movie_index)))
+        return self
+
+    def update(self, new_tags_df):
+        """
+        Add newly applied tags and patch only the affected content rows.
+
+        Args:
+            new_tags_df (pd.DataFrame): movieId and tag columns (e.g. a daily dump).
+
+        Returns:
+            np.ndarray: Row indices that changed.
+        """
+        affected, delta = self._hash_tags(new_tags_df)
+        if len(affected) == 0:
+            return affected
+        self.tag_counts = (self.tag_counts + delta).tocsr()
+
+        # Zero the stale rows and add the recomputed ones back in place
+        keep = np.ones(len(self.movie_index), dtype=np.float32)
+        keep[affected] = 0.0
+        placement = sparse.csr_matrix(
+            (np.ones(len(affected), dtype=np.float32), (affected, np.arange(len(affected)))),
+            shape=(len(self.movie_index), len(affected)),
+        )
+        self.content_matrix = (sparse.diags(keep) @ self.content_matrix
+                               + placement @ self._combine(affected)).tocsr()
+        self.content_matrix.eliminate_zeros()
+        logger.info(f"Updated content vectors for {len(affected)} movies")
+        return affected
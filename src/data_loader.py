@@ -1,21 +1,153 @@
+import hashlib
+import json
+import logging
+import os
+
+import numpy as np
 import pandas as pd
 
-def load_and_preprocess_data(movies_path = 'D:/Boring_Project1/data/movies.csv', ratings_path =r'D:/Boring_Project1/data/ratings.csv'):
-    """Loads, merges, and cleans the movie and rating datasets."""
-    movies = pd.read_csv(movies_path) 
-    movies["genres"] = movies["genres"].str.split("|")
-    movies_explode = movies.explode("genres")
-
-    ratings = pd.read_csv(ratings_path)
-# Since the timestamp is in seconds we will use datetime method from pandas to convert it.
-    ratings["date"] = pd.to_datetime(ratings["timestamp"], unit='s') 
-    ratings = ratings.drop(["timestamp"], axis=1)  # dropping the datetime column for uncessary changes 
-    ratings["date"] = ratings["date"].dt.date
-    
-    df = pd.merge(ratings, movies_explode)
-    
-    # ... add your other cleaning steps from EDA here ...
-    # (e.g., creating a 'year' column, handling missing values)
-    df['year'] = df['title'].str.extract(r'\((\d{4})\)')
-    
-    return df
\ No newline at end of file
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(script_dir)
+DATA_DIR = os.path.join(project_root, 'data')
+DEFAULT_MOVIES_PATH = os.path.join(DATA_DIR, 'movies.csv')
+DEFAULT_RATINGS_PATH = os.path.join(DATA_DIR, 'ratings.csv')
+DEFAULT_TAGS_PATH = os.path.join(DATA_DIR, 'tags.csv')
+DEFAULT_CACHE_DIR = os.path.join(DATA_DIR, 'cache')
+
+# Compact dtypes applied at parse time, so nothing is downcast afterwards
+MOVIES_DTYPES = {'movieId': np.int32, 'title': str, 'genres': 'category'}
+RATINGS_DTYPES = {'userId': np.int32, 'movieId': np.int32, 'rating': np.float32, 'timestamp': np.int64}
+TAGS_DTYPES = {'userId': np.int32, 'movieId': np.int32, 'tag': str, 'timestamp': np.int64}
+
+SNAPSHOT_VERSION = 1
+
+
+def load_movies(movies_path=DEFAULT_MOVIES_PATH):
+    """Read movies.csv with compact dtypes; genres stay pipe-separated categories."""
+    return pd.read_csv(movies_path, dtype=MOVIES_DTYPES)
+
+
+def load_ratings(ratings_path=DEFAULT_RATINGS_PATH):
+    """Read ratings.csv with compact dtypes."""
+    return pd.read_csv(ratings_path, dtype=RATINGS_DTYPES)
+
+
+def load_tags(tags_path=DEFAULT_TAGS_PATH):
+    """Read tags.csv with compact dtypes."""
+    return pd.read_csv(tags_path, dtype=TAGS_DTYPES)
+
+
+def _feather():
+    """pyarrow.feather, imported on first use; None without pyarrow."""
+    try:
+        import pyarrow.feather as feather
+    except ImportError:  # snapshots are an optimisation; CSV loading still works
+        return None
+    return feather
+
+
+def _source_fingerprint(paths):
+    """mtime/size of each source file; a snapshot is reused only if these match."""
+    return {os.path.abspath(p): [os.stat(p).st_mtime_ns, os.stat(p).st_size] for p in paths}
+
+
+def _snapshot_path(cache_dir, paths):
+    digest = hashlib.sha1('|'.join(os.path.abspath(p) for p in paths).encode('utf-8')).hexdigest()[:12]
+    return os.path.join(cache_dir, f'ratings_movies-{digest}.feather')
+
+
+def _read_snapshot(path, fingerprint):
+    try:
+        with open(path + '.json') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if manifest.get('version') != SNAPSHOT_VERSION or manifest.get('sources') != fingerprint:
+        return None
+    # Uncompressed Feather is memory-mapped, so columns are paged in lazily
+    return _feather().read_table(path, memory_map=True).to_pandas()
+
+
+def _write_snapshot(df, path, fingerprint):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    _feather().write_feather(df, path + '.tmp', compression='uncompressed')
+    os.replace(path + '.tmp', path)
+    with open(path + '.json', 'w') as f:
+        json.dump({'version': SNAPSHOT_VERSION, 'sources': fingerprint}, f)
+
+
+def load_and_preprocess_data(movies_path=DEFAULT_MOVIES_PATH, ratings_path=DEFAULT_RATINGS_PATH,
+                             cache_dir=DEFAULT_CACHE_DIR, use_cache=True):
+    """
+    Loads, merges, and cleans the movie and rating datasets.
+
+    Returns one row per rating with movie attributes attached. Genres stay a
+    pipe-separated categorical column instead of being exploded into one row
+    per genre. The first load writes a Feather snapshot to cache_dir; later
+    loads memory-map it as long as both CSVs are unchanged.
+
+    Args:
+        movies_path (str): Path to movies.csv.
+        ratings_path (str): Path to ratings.csv.
+        cache_dir (str): Where to keep the columnar snapshot.
+        use_cache (bool): Set False to always parse the CSVs.
+
+    Returns:
+        pd.DataFrame: userId, movieId, rating, date, title, genres, year.
+    """
+    use_cache = use_cache and cache_dir is not None and _feather() is not None
+    if use_cache:
+        fingerprint = _source_fingerprint([movies_path, ratings_path])
+        snapshot_path = _snapshot_path(cache_dir, [movies_path, ratings_path])
+        with metrics.span('data_snapshot_read'):
+            df = _read_snapshot(snapshot_path, fingerprint)
+        if df is not None:
+            logger.info(f"Loaded data snapshot {snapshot_path}")
+            metrics.increment('data_snapshot', result='hit')
+            return df
+        metrics.increment('data_snapshot', result='miss')
+
+    with metrics.span('data_load', source='csv'):
+        df = _build_frame(movies_path, ratings_path)
+
+    if use_cache:
+        try:
+            _write_snapshot(df, snapshot_path, fingerprint)
+        except OSError as e:
+            logger.warning(f"Could not write data snapshot: {e}")
+
+    return df
+
+
+def _build_frame(movies_path, ratings_path):
+    """Parse both CSVs and attach movie columns to every rating."""
+    with metrics.span('data_read_csv'):
+        movies = load_movies(movies_path).drop_duplicates('movieId').set_index('movieId')
+        ratings = load_ratings(ratings_path)
+
+    # Attach movie columns by position instead of merging against exploded genres
+    positions = movies.index.get_indexer(ratings['movieId'])
+    known = positions >= 0
+    ratings = ratings[known].reset_index(drop=True)
+    positions = positions[known]
+
+    # Since the timestamp is in seconds, integer-divide to whole days and view as datetime64
+    date = (ratings['timestamp'].to_numpy() // 86400).astype('datetime64[D]')
+    # Titles are not unique across movieIds, so factorise them before taking
+    title_codes, titles = pd.factorize(movies['title'])
+    title = pd.Categorical.from_codes(title_codes[positions], categories=titles)
+    year = movies['title'].str.extract(r'\((\d{4})\)', expand=False).astype('Int16')
+
+    return pd.DataFrame({
+        'userId': ratings['userId'],
+        'movieId': ratings['movieId'],
+        'rating': ratings['rating'],
+        'date': date,
+        'title': title,
+        'genres': movies['genres'].array.take(positions),
+        'year': year.array.take(positions),
+    })
@@ -0,0 +1,306 @@
+"""
+Offline evaluation of the recommender on a time-based split of ratings.csv.
+
+Ratings before a timestamp cutoff train the model (genre TF-IDF, CF
+factors, tag content; see src.build_model) and the user profiles (see
+src.user_profiles). Each user who rated something in both halves is then
+asked for top-k recommendations, and the titles they rated at least
+--min-rating after the cutoff count as relevant.
+
+A user's query is their top --query-genres genre affinities from the
+training half, standing in for the genres the NLP model would extract from
+their thought. Every strategy (plain genre scoring, hybrid, personalised,
+and a most-rated baseline) is scored with precision@k, recall@k and NDCG@k
+averaged over users, plus catalog coverage (share of titles recommended to
+anyone).
+
+Users are sharded across a ProcessPoolExecutor. The model, profile store
+and test relevance lists are written to --output-dir once and every worker
+memory-maps them, so only shard bounds and per-user metric arrays cross
+process boundaries.
+
+Usage:
+    python -m src.evaluate [--k 10] [--test-fraction 0.2] [--workers 4]
+    python -m src.evaluate --output results.json
+    python -m src.evaluate --compare results.json    # A/B against a saved run
+"""
+import argparse
+import json
+import logging
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from .build_model import build_model, save_model
+from .collaborative import build_rating_matrix
+from .data_loader import DEFAULT_MOVIES_PATH, DEFAULT_RATINGS_PATH, DEFAULT_TAGS_PATH, load_ratings
+from .model_store import load_model, read_manifest
+from .recommend_engine import GenreRecommender
+from .user_profiles import build_profiles
+
+logger = logging.getLogger(__name__)
+
+METRICS = ('precision', 'recall', 'ndcg')
+# Strategy -> recommend() options; None is the most-rated baseline
+STRATEGIES = {
+    'popularity': None,
+    'genre': {'scoring': 'genre'},
+    'hybrid': {'scoring': 'hybrid'},
+    'personalized': {'scoring': 'genre', 'personalized': True},
+    'hybrid_personalized': {'scoring': 'hybrid', 'personalized': True},
+}
+DEFAULT_STRATEGIES = ('popularity', 'genre', 'hybrid', 'personalized')
+
+# Per-process state set up by _init_worker: the memory-mapped model and test data
+_worker = {}
+
+
+def time_split(ratings, test_fraction=0.2):
+    """
+    Split ratings at the timestamp below which (1 - test_fraction) of them fall.
+
+    Returns:
+        tuple: (train ratings, test ratings, cutoff timestamp)
+    """
+    cutoff = int(np.quantile(ratings['timestamp'].to_numpy(), 1.0 - test_fraction))
+    before = ratings['timestamp'].to_numpy() < cutoff
+    return ratings[before], ratings[~before], cutoff
+
+
+def rank_metrics(recommended, relevant, k):
+    """
+    Precision@k, recall@k and binary-relevance NDCG@k for one user.
+
+    Args:
+        recommended (np.ndarray): Recommended item rows, best first.
+        relevant (np.ndarray): Item rows the user found relevant (non-empty).
+        k (int): Cutoff.
+
+    Returns:
+        tuple: (precision, recall, ndcg)
+    """
+    hits = np.isin(recommended[:k], relevant)
+    discounts = 1.0 / np.log2(np.arange(2, k + 2))
+    dcg = discounts[:len(hits)][hits].sum()
+    idcg = discounts[:min(len(relevant), k)].sum()
+    n_hits = hits.sum()
+    return n_hits / k, n_hits / len(relevant), dcg / idcg
+
+
+def _init_worker(directory, strict, query_genres, seed):
+    from .user_profiles import load_profiles
+
+    # The engine logs every query at INFO level
+    logging.getLogger('src.recommend_engine').setLevel(logging.WARNING)
+    recommender = GenreRecommender(os.path.join(directory, 'model'), cache_size=0,
+                                   profile_path=os.path.join(directory, 'profiles'))
+    _worker.update(
+        recommender=recommender,
+        profiles=load_profiles(os.path.join(directory, 'profiles')),
+        users=np.load(os.path.join(directory, 'test_users.npy'), mmap_mode='r'),
+        relevant_ptr=np.load(os.path.join(directory, 'test_indptr.npy'), mmap_mode='r'),
+        relevant_rows=np.load(os.path.join(directory, 'test_indices.npy'), mmap_mode='r'),
+        genre_names=list(recommender.genre_index),
+        most_rated=np.argsort(-recommender.popularity['rating_count'], kind='stable'),
+        strict=strict,
+        query_genres=query_genres,
+        seed=seed,
+    )
+
+
+def profile_query(affinity, genre_names, n_genres):
+    """A user's strongest positive genre affinities as a genre:score query."""
+    top = np.argsort(-affinity, kind='stable')[:n_genres]
+    return {genre_names[c]: float(affinity[c]) for c in top if affinity[c] > 0}
+
+
+def evaluate_shard(start, stop, strategies, k):
+    """
+    Score test users start:stop in this worker.
+
+    Returns:
+        dict: strategy -> {'precision', 'recall', 'ndcg': per-user arrays,
+        'items': unique recommended item rows}
+    """
+    recommender = _worker['recommender']
+    profiles = _worker['profiles']
+
+    results = {name: {metric: np.zeros(stop - start) for metric in METRICS} for name in strategies}
+    recommended = {name: [] for name in strategies}
+    for i in range(start, stop):
+        user_id = int(_worker['users'][i])
+        relevant = _worker['relevant_rows'][_worker['relevant_ptr'][i]:_worker['relevant_ptr'][i + 1]]
+        query = profile_query(profiles.affinity[profiles.row(user_id)], _worker['genre_names'],
+                              _worker['query_genres'])
+        for name in strategies:
+            options = STRATEGIES[name]
+            if options is None:
+                rows = _worker['most_rated'][:k]
+            else:
+                # Random fallbacks (tied or empty queries) depend only on the seed and the
+                # user, not on how users are sharded or which strategies run
+                rng = np.random.default_rng((_worker['seed'], user_id))
+                rows = recommender.rank_rows(query, top_k=k, strict=_worker['strict'], scoring=options['scoring'],
+                                             user_id=user_id if options.get('personalized') else None, rng=rng)
+            for metric, value in zip(METRICS, rank_metrics(rows, relevant, k)):
+                results[name][metric][i - start] = value
+            recommended[name].append(rows)
+
+    for name in strategies:
+        results[name]['items'] = np.unique(np.concatenate(recommended[name] or [np.empty(0, dtype=np.int64)]))
+    return results
+
+
+def prepare(directory, ratings_path=DEFAULT_RATINGS_PATH, movies_path=DEFAULT_MOVIES_PATH,
+            tags_path=DEFAULT_TAGS_PATH, test_fraction=0.2, min_rating=4.0, factors=32):
+    """
+    Split the ratings, build the model and profiles on the training half, and
+    write them with the test relevance lists into directory.
+
+    Returns:
+        dict: Split and build statistics.
+    """
+    start = time.perf_counter()
+    ratings = load_ratings(ratings_path)
+    train, test, cutoff = time_split(ratings, test_fraction)
+    logger.info(f"Split {len(ratings)} ratings at {time.strftime('%Y-%m-%d', time.gmtime(cutoff))}: "
+                f"{len(train)} train, {len(test)} test")
+
+    model_components = build_model(movies_path, factors=factors, tags_path=tags_path, ratings=train)
+    save_model(model_components, os.path.join(directory, 'model'))
+    profiles = build_profiles(train, load_model(os.path.join(directory, 'model')))
+    profiles.save(os.path.join(directory, 'profiles'))
+
+    # Relevant test items per user, for users the training half knows about
+    test = test[(test['rating'] >= min_rating) & test['userId'].isin(profiles.user_ids)]
+    relevance, test_users = build_rating_matrix(test, model_components['movie_ids'])
+    keep = np.diff(relevance.indptr) > 0
+    relevance = relevance[keep]
+    np.save(os.path.join(directory, 'test_users.npy'), test_users[keep])
+    np.save(os.path.join(directory, 'test_indptr.npy'), relevance.indptr)
+    np.save(os.path.join(directory, 'test_indices.npy'), relevance.indices)
+
+    stats = {'cutoff': cutoff, 'train_ratings': len(train), 'test_ratings': len(test),
+             'users': int(keep.sum()), 'items': len(model_components['movie_ids']),
+             'prepare_seconds': round(time.perf_counter() - start, 3)}
+    logger.info(f"Prepared {stats['users']} test users in {stats['prepare_seconds']:.2f}s")
+    return stats
+
+
+def evaluate(directory, strategies=DEFAULT_STRATEGIES, k=10, strict=True, query_genres=3,
+             workers=None, shard_size=None, seed=0):
+    """
+    Score every test user prepared in directory, sharded across processes.
+
+    Args:
+        directory (str): Directory written by prepare().
+        strategies (tuple): Names from STRATEGIES.
+        k (int): Recommendation list length.
+        strict (bool): Passed to the recommender as strict.
+        query_genres (int): Genres per user query.
+        workers (int): Worker processes (default os.cpu_count(); 0 runs in-process).
+        shard_size (int): Users per task (default: about four tasks per worker).
+        seed (int): Seed for the recommender's random fallbacks.
+
+    Returns:
+        dict: strategy -> mean precision/recall/ndcg and catalog coverage.
+    """
+    for name in strategies:
+        if name not in STRATEGIES:
+            raise ValueError(f"Unknown strategy: {name}")
+    start = time.perf_counter()
+    n_users = len(np.load(os.path.join(directory, 'test_users.npy'), mmap_mode='r'))
+    workers = os.cpu_count() if workers is None else workers
+    shard_size = shard_size or max(1, -(-n_users // (max(workers, 1) * 4)))
+    shards = [(lo, min(lo + shard_size, n_users)) for lo in range(0, n_users, shard_size)]
+    init_args = (directory, strict, query_genres, seed)
+
+    if workers == 0:
+        _init_worker(*init_args)
+        parts = [evaluate_shard(lo, hi, strategies, k) for lo, hi in shards]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=init_args) as pool:
+            futures = [pool.submit(evaluate_shard, lo, hi, strategies, k) for lo, hi in shards]
+            parts = [future.result() for future in futures]
+
+    n_items = read_manifest(os.path.join(directory, 'model'))['num_titles']
+    results = {}
+    for name in strategies:
+        summary = {metric: float(np.concatenate([part[name][metric] for part in parts]).mean())
+                   if parts else 0.0 for metric in METRICS}
+        items = np.unique(np.concatenate([part[name]['items'] for part in parts])) if parts else []
+        summary['coverage'] = len(items) / n_items
+        results[name] = summary
+    logger.info(f"Scored {n_users} users x {len(strategies)} strategies in {len(shards)} shards "
+                f"on {workers or 1} process(es) in {time.perf_counter() - start:.2f}s")
+    return results
+
+
+def format_results(results, k, baseline=None):
+    """Results as a table, with deltas against a baseline run if given."""
+    width = 22 if baseline else 14
+    columns = [f'{metric}@{k}' for metric in METRICS] + ['coverage']
+    lines = [f"{'strategy':<22}" + ''.join(f"{column:>{width}}" for column in columns)]
+    for name, summary in results.items():
+        cells = []
+        for metric in METRICS + ('coverage',):
+            cell = f"{summary[metric]:.4f}"
+            if baseline and name in baseline:
+                cell += f" ({summary[metric] - baseline[name][metric]:+.4f})"
+            cells.append(f"{cell:>{width}}")
+        lines.append(f"{name:<22}" + ''.join(cells))
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build the model on a time-based split and evaluate it offline.")
+    parser.add_argument('--movies', default=DEFAULT_MOVIES_PATH, help="Path to movies.csv")
+    parser.add_argument('--ratings', default=DEFAULT_RATINGS_PATH, help="Path to ratings.csv")
+    parser.add_argument('--tags', default=DEFAULT_TAGS_PATH, help="Path to tags.csv")
+    parser.add_argument('--factors', type=int, default=32, help="Collaborative-filtering factors")
+    parser.add_argument('--test-fraction', type=float, default=0.2,
+                        help="Share of ratings (latest by timestamp) held out for testing")
+    parser.add_argument('--min-rating', type=float, default=4.0, help="Test ratings at or above this are relevant")
+    parser.add_argument('--k', type=int, default=10, help="Recommendation list length")
+    parser.add_argument('--query-genres', type=int, default=3, help="Genres in each user's query")
+    parser.add_argument('--strategies', nargs='+', default=list(DEFAULT_STRATEGIES), choices=list(STRATEGIES))
+    parser.add_argument('--loose', action='store_true', help="Rank all titles, not only genre matches")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="Worker processes (default: CPU count; 0 runs in-process)")
+    parser.add_argument('--shard-size', type=int, default=None, help="Users per worker task")
+    parser.add_argument('--output-dir', help="Keep the split artifacts here (default: a temporary directory)")
+    parser.add_argument('--output', help="Write the results as JSON")
+    parser.add_argument('--compare', help="Show deltas against results JSON from an earlier run")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    directory = args.output_dir or tempfile.mkdtemp(prefix='evaluate-')
+    os.makedirs(directory, exist_ok=True)
+    try:
+        stats = prepare(directory, args.ratings, args.movies, args.tags, args.test_fraction,
+                        args.min_rating, args.factors)
+        results = evaluate(directory, tuple(args.strategies), args.k, not args.loose, args.query_genres,
+                           args.workers, args.shard_size)
+    finally:
+        if not args.output_dir:
+            shutil.rmtree(directory, ignore_errors=True)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)['results']
+    print(format_results(results, args.k, baseline))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'params': {key: value for key, value in vars(args).items()
+                                  if key not in ('output', 'compare', 'output_dir')},
+                       'split': stats, 'results': results}, f, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
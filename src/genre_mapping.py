@@ -0,0 +1,94 @@
+from scipy import sparse
+
+# The 20 genre values that appear in MovieLens movies.csv
+MOVIELENS_GENRES = [
+    'Action', 'Adventure', 'Animation', 'Children', 'Comedy', 'Crime',
+    'Documentary', 'Drama', 'Fantasy', 'Film-Noir', 'Horror', 'IMAX',
+    'Musical', 'Mystery', 'Romance', 'Sci-Fi', 'Thriller', 'War', 'Western',
+    '(no genres listed)'
+]
+
+# NLP label -> MovieLens genre weights. Covers every label in
+# tweet_nlp.candidate_genres; the MovieLens genres themselves map onto
+# themselves so plain genre names keep working.
+LABEL_TO_MOVIELENS = {
+    **{genre: {genre: 1.0} for genre in MOVIELENS_GENRES},
+
+    # Core Genres without a MovieLens equivalent
+    'History': {'Drama': 0.5, 'Documentary': 0.25, 'War': 0.25},
+
+    # Sub-genres and Hybrid Genres
+    'Romantic Comedy': {'Romance': 0.5, 'Comedy': 0.5},
+    'Action Comedy': {'Action': 0.5, 'Comedy': 0.5},
+    'Horror Comedy': {'Horror': 0.5, 'Comedy': 0.5},
+    'Sci-Fi Horror': {'Sci-Fi': 0.5, 'Horror': 0.5},
+    'Action Thriller': {'Action': 0.5, 'Thriller': 0.5},
+    'Crime Thriller': {'Crime': 0.5, 'Thriller': 0.5},
+    'Psychological Thriller': {'Thriller': 0.6, 'Mystery': 0.2, 'Drama': 0.2},
+    'Supernatural Horror': {'Horror': 0.7, 'Fantasy': 0.3},
+    'Slasher Horror': {'Horror': 0.7, 'Thriller': 0.3},
+    'Psychological Horror': {'Horror': 0.6, 'Thriller': 0.4},
+    'Historical Drama': {'Drama': 0.8, 'War': 0.2},
+    'War Drama': {'War': 0.5, 'Drama': 0.5},
+    'Crime Drama': {'Crime': 0.5, 'Drama': 0.5},
+    'Legal Drama': {'Drama': 0.7, 'Crime': 0.3},
+    'Superhero Action': {'Action': 0.5, 'Adventure': 0.25, 'Sci-Fi': 0.25},
+    'Martial Arts': {'Action': 1.0},
+    'Heist Film': {'Crime': 0.6, 'Thriller': 0.2, 'Action': 0.2},
+    'Spy Film': {'Action': 0.4, 'Thriller': 0.4, 'Adventure': 0.2},
+    'Disaster Film': {'Action': 0.4, 'Thriller': 0.3, 'Drama': 0.3},
+    'Mockumentary': {'Comedy': 0.7, 'Documentary': 0.3},
+    'Biographical Drama': {'Drama': 0.8, 'Documentary': 0.2},
+
+    # Mood-based Genres
+    'Dark Comedy': {'Comedy': 0.6, 'Crime': 0.2, 'Drama': 0.2},
+    'Black Comedy': {'Comedy': 0.6, 'Crime': 0.2, 'Drama': 0.2},
+    'Satire': {'Comedy': 0.8, 'Drama': 0.2},
+    'Parody': {'Comedy': 1.0},
+    'Epic': {'Adventure': 0.4, 'Drama': 0.3, 'War': 0.3},
+    'Noir': {'Film-Noir': 0.6, 'Crime': 0.2, 'Mystery': 0.2},
+    'Gothic': {'Horror': 0.5, 'Fantasy': 0.25, 'Mystery': 0.25},
+    'Melodrama': {'Drama': 0.6, 'Romance': 0.4},
+    'Tragicomedy': {'Comedy': 0.5, 'Drama': 0.5},
+
+    # Niche/Specific Genres
+    'Sports Drama': {'Drama': 1.0},
+    'Teen Comedy': {'Comedy': 1.0},
+    'Coming of Age': {'Drama': 0.6, 'Comedy': 0.4},
+    'Family Film': {'Children': 0.6, 'Comedy': 0.2, 'Adventure': 0.2},
+    'Children\'s Film': {'Children': 0.7, 'Animation': 0.3},
+    'Anime': {'Animation': 1.0},
+    'Silent Film': {'Drama': 0.5, 'Comedy': 0.5},
+    'Road Movie': {'Adventure': 0.5, 'Comedy': 0.25, 'Drama': 0.25},
+    'Courtroom Drama': {'Drama': 0.7, 'Crime': 0.3},
+    'Political Thriller': {'Thriller': 0.7, 'Drama': 0.3},
+}
+
+
+def compile_label_matrix(columns_for, num_columns, table=LABEL_TO_MOVIELENS):
+    """
+    Compile the label table into a sparse label x model-column weight matrix.
+
+    Args:
+        columns_for (callable): Maps a MovieLens genre name to the model
+            columns that represent it (see GenreRecommender.columns_for).
+        num_columns (int): Number of columns in the model's genre matrix.
+        table (dict): Label -> {MovieLens genre: weight}.
+
+    Returns:
+        tuple: (dict of label:row index, scipy.sparse.csr_matrix of shape
+        (len(table), num_columns))
+    """
+    label_index = {label: i for i, label in enumerate(table)}
+    rows, cols, weights = [], [], []
+    for label, genre_weights in table.items():
+        for genre, weight in genre_weights.items():
+            columns = columns_for(genre)
+            for column in columns:
+                rows.append(label_index[label])
+                cols.append(column)
+                weights.append(weight / len(columns))
+
+    label_matrix = sparse.csr_matrix((weights, (rows, cols)), shape=(len(table), num_columns))
+    label_matrix.sum_duplicates()
+    return label_index, label_matrix
@@ -0,0 +1,278 @@
+"""
+Nearest-neighbour search over item vectors (genre/tag TF-IDF rows or CF factors).
+
+Two backends share one interface:
+
+- ExactIndex: cosine similarity via blocked matrix multiplies, keeping a
+  running top-k per query so memory stays bounded by the block size.
+- LSHIndex: random-hyperplane LSH; candidates come from matching buckets
+  (plus Hamming-1 probes) and are re-ranked exactly.
+
+Both support batched query(vectors, k) and save()/load_index(), where
+arrays are written as .npy and opened again with mmap_mode='r'.
+"""
+import json
+import os
+
+import numpy as np
+from scipy import sparse
+
+MANIFEST_NAME = 'index.json'
+
+
+def _normalize(vectors):
+    """L2-normalise rows of a dense or sparse matrix as float32."""
+    if sparse.issparse(vectors):
+        vectors = sparse.csr_matrix(vectors, dtype=np.float32)
+        norms = np.sqrt(np.asarray(vectors.multiply(vectors).sum(axis=1)).ravel())
+        norms[norms == 0] = 1.0
+        return sparse.csr_matrix(vectors.multiply(1.0 / norms[:, None]), dtype=np.float32)
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def _as_queries(vectors):
+    """Accept a single vector or a batch; return a normalised 2-D batch."""
+    if not sparse.issparse(vectors):
+        vectors = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+    return _normalize(vectors)
+
+
+def _dense(matrix):
+    return matrix.toarray() if sparse.issparse(matrix) else np.asarray(matrix)
+
+
+def _merge_top_k(best_indices, best_scores, indices, scores, k):
+    """Merge a block's candidates into the running per-row top-k."""
+    indices = np.hstack([best_indices, indices])
+    scores = np.hstack([best_scores, scores])
+    if scores.shape[1] > k:
+        keep = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        indices = np.take_along_axis(indices, keep, axis=1)
+        scores = np.take_along_axis(scores, keep, axis=1)
+    return indices, scores
+
+
+def _sort_rows(indices, scores):
+    order = np.argsort(-scores, axis=1, kind='stable')
+    return np.take_along_axis(indices, order, axis=1), np.take_along_axis(scores, order, axis=1)
+
+
+def _save_vectors(vectors, path):
+    if sparse.issparse(vectors):
+        for name in ('data', 'indices', 'indptr'):
+            np.save(os.path.join(path, f'vectors_{name}.npy'), getattr(vectors, name))
+    else:
+        np.save(os.path.join(path, 'vectors.npy'), vectors)
+
+
+def _load_vectors(path, manifest, mmap_mode):
+    if manifest['sparse']:
+        data, indices, indptr = (np.load(os.path.join(path, f'vectors_{name}.npy'), mmap_mode=mmap_mode)
+                                 for name in ('data', 'indices', 'indptr'))
+        return sparse.csr_matrix((data, indices, indptr), shape=tuple(manifest['shape']), copy=False)
+    return np.load(os.path.join(path, 'vectors.npy'), mmap_mode=mmap_mode)
+
+
+class ExactIndex:
+    """
+    Exact cosine top-k over item vectors using blocked matrix multiplies.
+
+    Args:
+        vectors (array or sparse matrix): One row per item.
+        block_size (int): Items scored per matmul block.
+    """
+
+    backend = 'exact'
+
+    def __init__(self, vectors, block_size=65536, normalized=False):
+        self.vectors = vectors if normalized else _normalize(vectors)
+        self.block_size = block_size
+
+    def __len__(self):
+        return self.vectors.shape[0]
+
+    def query(self, vectors, k=10):
+        """
+        Return the k most similar items for each query vector.
+
+        Args:
+            vectors (array or sparse matrix): One query per row (or a single vector).
+            k (int): Number of neighbours per query.
+
+        Returns:
+            tuple: (indices, scores), both of shape (n_queries, min(k, n_items)),
+            best first.
+        """
+        queries = _as_queries(vectors)
+        k = min(k, len(self))
+        best_indices = np.empty((queries.shape[0], 0), dtype=np.int64)
+        best_scores = np.empty((queries.shape[0], 0), dtype=np.float32)
+
+        for start in range(0, len(self), self.block_size):
+            block = self.vectors[start:start + self.block_size]
+            scores = _dense(queries @ block.T)
+            block_k = min(k, scores.shape[1])
+            top = np.argpartition(-scores, block_k - 1, axis=1)[:, :block_k]
+            best_indices, best_scores = _merge_top_k(
+                best_indices, best_scores, top + start, np.take_along_axis(scores, top, axis=1), k)
+
+        return _sort_rows(best_indices, best_scores)
+
+    def save(self, path):
+        """Write the index to a directory of .npy files plus a JSON manifest."""
+        os.makedirs(path, exist_ok=True)
+        _save_vectors(self.vectors, path)
+        with open(os.path.join(path, MANIFEST_NAME), 'w') as f:
+            json.dump({'backend': self.backend, 'sparse': sparse.issparse(self.vectors),
+                       'shape': list(self.vectors.shape), 'block_size': self.block_size}, f)
+
+
+class LSHIndex:
+    """
+    Approximate cosine top-k with random-hyperplane LSH.
+
+    Each of n_tables tables hashes an item to an n_bits signature (the signs
+    of its projections on random hyperplanes). A query gathers the items that
+    share its bucket, or differ by one bit when probe_neighbors is set, in
+    any table, then re-ranks them exactly. If fewer than k candidates are
+    found, the query falls back to exact search.
+
+    Args:
+        vectors (array or sparse matrix): One row per item.
+        n_bits (int): Signature length per table (at most 63).
+        n_tables (int): Number of independent hash tables.
+        probe_neighbors (bool): Also probe buckets at Hamming distance 1.
+        seed (int): Seed for the random hyperplanes.
+    """
+
+    backend = 'lsh'
+
+    def __init__(self, vectors, n_bits=12, n_tables=8, probe_neighbors=True, seed=0, normalized=False):
+        self.vectors = vectors if normalized else _normalize(vectors)
+        self.n_bits = n_bits
+        self.n_tables = n_tables
+        self.probe_neighbors = probe_neighbors
+        self.seed = seed
+        rng = np.random.default_rng(seed)
+        self.planes = rng.standard_normal((self.vectors.shape[1], n_tables * n_bits)).astype(np.float32)
+        self._build_tables()
+
+    def __len__(self):
+        return self.vectors.shape[0]
+
+    def _signatures(self, vectors):
+        """(n, n_tables) uint64 bucket codes."""
+        bits = (_dense(vectors @ self.planes) > 0).reshape(vectors.shape[0], self.n_tables, self.n_bits)
+        return (bits.astype(np.uint64) << np.arange(self.n_bits, dtype=np.uint64)).sum(axis=2, dtype=np.uint64)
+
+    def _build_tables(self):
+        codes = self._signatures(self.vectors)
+        # Per table: item ids sorted by code, and the sorted codes for searchsorted
+        self.table_order = np.argsort(codes, axis=0, kind='stable').T.copy()
+        self.table_codes = np.take_along_axis(codes.T, self.table_order, axis=1)
+
+    def _candidates(self, codes):
+        probes = [np.uint64(0)]
+        if self.probe_neighbors:
+            probes += [np.uint64(1) << np.uint64(bit) for bit in range(self.n_bits)]
+        found = []
+        for table in range(self.n_tables):
+            sorted_codes = self.table_codes[table]
+            for probe in probes:
+                code = codes[table] ^ probe
+                lo, hi = np.searchsorted(sorted_codes, [code, code + np.uint64(1)])
+                found.append(self.table_order[table, lo:hi])
+        return np.unique(np.concatenate(found))
+
+    def query(self, vectors, k=10):
+        """
+        Return approximately the k most similar items for each query vector.
+
+        Returns:
+            tuple: (indices, scores) of shape (n_queries, min(k, n_items)), best first.
+        """
+        queries = _as_queries(vectors)
+        k = min(k, len(self))
+        signatures = self._signatures(queries)
+        indices = np.empty((queries.shape[0], k), dtype=np.int64)
+        scores = np.empty((queries.shape[0], k), dtype=np.float32)
+
+        for row in range(queries.shape[0]):
+            query = queries[row]
+            candidates = self._candidates(signatures[row])
+            if len(candidates) < k:
+                candidates = np.arange(len(self))
+            candidate_scores = _dense(self.vectors[candidates] @ query.T).ravel()
+            top = np.argpartition(-candidate_scores, k - 1)[:k]
+            top = top[np.argsort(-candidate_scores[top], kind='stable')]
+            indices[row] = candidates[top]
+            scores[row] = candidate_scores[top]
+
+        return indices, scores
+
+    def save(self, path):
+        """Write the index to a directory of .npy files plus a JSON manifest."""
+        os.makedirs(path, exist_ok=True)
+        _save_vectors(self.vectors, path)
+        np.save(os.path.join(path, 'planes.npy'), self.planes)
+        np.save(os.path.join(path, 'table_order.npy'), self.table_order)
+        np.save(os.path.join(path, 'table_codes.npy'), self.table_codes)
+        with open(os.path.join(path, MANIFEST_NAME), 'w') as f:
+            json.dump({'backend': self.backend, 'sparse': sparse.issparse(self.vectors),
+                       'shape': list(self.vectors.shape), 'n_bits': self.n_bits,
+                       'n_tables': self.n_tables, 'probe_neighbors': self.probe_neighbors,
+                       'seed': self.seed}, f)
+
+
+BACKENDS = {ExactIndex.backend: ExactIndex, LSHIndex.backend: LSHIndex}
+
+
+def build_index(vectors, backend='exact', **params):
+    """
+    Build an item index.
+
+    Args:
+        vectors (array or sparse matrix): One row per item.
+        backend (str): "exact" or "lsh".
+        **params: Backend-specific options (see ExactIndex / LSHIndex).
+
+    Returns:
+        ExactIndex or LSHIndex: The index.
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown index backend: {backend}")
+    return BACKENDS[backend](vectors, **params)
+
+
+def load_index(path, mmap_mode='r'):
+    """
+    Open an index written by save(); arrays are memory-mapped by default.
+
+    Args:
+        path (str): Index directory.
+        mmap_mode (str): Passed to np.load ('r' shares pages between processes;
+            None reads everything into memory).
+
+    Returns:
+        ExactIndex or LSHIndex: The index.
+    """
+    with open(os.path.join(path, MANIFEST_NAME)) as f:
+        manifest = json.load(f)
+    vectors = _load_vectors(path, manifest, mmap_mode)
+
+    index = object.__new__(BACKENDS[manifest['backend']])
+    index.vectors = vectors
+    if manifest['backend'] == ExactIndex.backend:
+        index.block_size = manifest['block_size']
+    else:
+        index.n_bits = manifest['n_bits']
+        index.n_tables = manifest['n_tables']
+        index.probe_neighbors = manifest['probe_neighbors']
+        index.seed = manifest['seed']
+        index.planes = np.load(os.path.join(path, 'planes.npy'), mmap_mode=mmap_mode)
+        index.table_order = np.load(os.path.join(path, 'table_order.npy'), mmap_mode=mmap_mode)
+        index.table_codes = np.load(os.path.join(path, 'table_codes.npy'), mmap_mode=mmap_mode)
+    return index
@@ -0,0 +1,297 @@
+"""
+Lightweight instrumentation: timing spans, counters and histograms.
+
+Instrumentation is off by default; every call then returns after a single
+flag check, so the hooks can stay in hot paths. Turn it on with enable()
+(or the PIPELINE_METRICS environment variable) and one or more sinks:
+
+    from src import metrics
+    sink = metrics.PrometheusSink()
+    metrics.enable(sink)
+
+    with metrics.span('recommend', scoring='genre'):
+        ...
+    metrics.increment('recommend_fallback', reason='no_valid_genres')
+
+    print(sink.render())
+
+A span records its duration in seconds as an observation named after the
+span (with a _seconds suffix in Prometheus output). Counters and
+observations carry optional string labels.
+
+PIPELINE_METRICS accepts a comma-separated list of "memory",
+"prometheus" and "jsonl:<path>".
+"""
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+# Latency buckets in seconds, from sub-millisecond lookups to model loads
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+# Buckets for observations that are counts rather than durations
+SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024, 4096, 16384, 65536, 262144, 1048576)
+SIZE_METRICS = {'recommend_candidates': SIZE_BUCKETS, 'nlp_batch_size': SIZE_BUCKETS}
+
+_sinks = []
+_enabled = False
+_local = threading.local()
+
+
+def _label_key(labels):
+    return tuple(sorted((str(k), str(v)) for k, v in labels.items()))
+
+
+def _escape_label(value):
+    """Escape a label value for the Prometheus text exposition format."""
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class InMemorySink:
+    """
+    Aggregates counters and observations in memory, and keeps recent events.
+
+    Args:
+        max_events (int): Number of raw events kept for inspection.
+    """
+
+    def __init__(self, max_events=10000):
+        self.counters = {}
+        self.observations = {}
+        self.events = deque(maxlen=max_events)
+        self._lock = threading.Lock()
+
+    def record(self, event):
+        key = (event['name'], _label_key(event['labels']))
+        with self._lock:
+            self.events.append(event)
+            if event['kind'] == 'counter':
+                self.counters[key] = self.counters.get(key, 0) + event['value']
+            else:
+                self.observations.setdefault(key, []).append(event['value'])
+
+    def count(self, name, **labels):
+        """Current value of a counter (0 if never incremented)."""
+        return self.counters.get((name, _label_key(labels)), 0)
+
+    def values(self, name, **labels):
+        """Observed values (durations in seconds for spans), oldest first."""
+        return list(self.observations.get((name, _label_key(labels)), []))
+
+    def clear(self):
+        with self._lock:
+            self.counters.clear()
+            self.observations.clear()
+            self.events.clear()
+
+
+class JSONLinesSink:
+    """
+    Appends every event to a file as one JSON object per line.
+
+    Args:
+        path (str): File to append to (created if missing).
+    """
+
+    def __init__(self, path):
+        self.path = path
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._file = open(path, 'a', buffering=1, encoding='utf-8')
+        self._lock = threading.Lock()
+
+    def record(self, event):
+        line = json.dumps(event)
+        with self._lock:
+            self._file.write(line + '\n')
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+class PrometheusSink:
+    """
+    Aggregates events into counters and bucketed histograms and renders them
+    in the Prometheus text exposition format (e.g. for a /metrics endpoint).
+
+    Args:
+        prefix (str): Prepended to every metric name.
+        buckets (tuple): Default histogram bucket upper bounds.
+        bucket_overrides (dict): Metric name -> buckets for metrics that are
+            not durations (defaults to SIZE_METRICS).
+    """
+
+    def __init__(self, prefix='thought_to_title_', buckets=DEFAULT_BUCKETS, bucket_overrides=None):
+        self.prefix = prefix
+        self.buckets = tuple(buckets)
+        self.bucket_overrides = dict(SIZE_METRICS if bucket_overrides is None else bucket_overrides)
+        self._counters = {}
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def record(self, event):
+        # Span durations follow the Prometheus unit-suffix convention
+        name = event['name'] + '_seconds' if event['kind'] == 'span' else event['name']
+        key = (name, _label_key(event['labels']))
+        value = event['value']
+        with self._lock:
+            if event['kind'] == 'counter':
+                self._counters[key] = self._counters.get(key, 0) + value
+                return
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                bounds = tuple(self.bucket_overrides.get(name, self.buckets))
+                histogram = self._histograms[key] = {'bounds': bounds, 'buckets': [0] * len(bounds),
+                                                     'sum': 0.0, 'count': 0}
+            for i, bound in enumerate(histogram['bounds']):
+                if value <= bound:
+                    histogram['buckets'][i] += 1
+            histogram['sum'] += value
+            histogram['count'] += 1
+
+    @staticmethod
+    def _labels(pairs):
+        if not pairs:
+            return ''
+        return '{' + ','.join(f'{k}="{_escape_label(v)}"' for k, v in pairs) + '}'
+
+    def render(self):
+        """Return all metrics as Prometheus text format."""
+        lines = []
+        with self._lock:
+            typed = set()
+            for (name, labels), value in sorted(self._counters.items()):
+                metric = f'{self.prefix}{name}_total'
+                if metric not in typed:
+                    lines.append(f'# TYPE {metric} counter')
+                    typed.add(metric)
+                lines.append(f'{metric}{self._labels(labels)} {value}')
+            for (name, labels), histogram in sorted(self._histograms.items()):
+                metric = f'{self.prefix}{name}'
+                if metric not in typed:
+                    lines.append(f'# TYPE {metric} histogram')
+                    typed.add(metric)
+                for bound, count in zip(histogram['bounds'], histogram['buckets']):
+                    lines.append(f'{metric}_bucket{self._labels(labels + (("le", repr(bound)),))} {count}')
+                lines.append(f'{metric}_bucket{self._labels(labels + (("le", "+Inf"),))} {histogram["count"]}')
+                lines.append(f'{metric}_sum{self._labels(labels)} {histogram["sum"]}')
+                lines.append(f'{metric}_count{self._labels(labels)} {histogram["count"]}')
+        return '\n'.join(lines) + '\n'
+
+
+class _NoopSpan:
+    """Shared do-nothing context manager returned while metrics are disabled."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class Span:
+    """Times a block and reports its duration (in seconds) when it exits."""
+
+    def __init__(self, name, labels):
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self):
+        stack = getattr(_local, 'stack', None)
+        if stack is None:
+            stack = _local.stack = []
+        self.parent = stack[-1] if stack else None
+        stack.append(self.name)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        duration = time.perf_counter() - self.start
+        _local.stack.pop()
+        labels = dict(self.labels, error=exc_type.__name__) if exc_type else self.labels
+        _emit('span', self.name, duration, labels, parent=self.parent)
+        return False
+
+
+def _emit(kind, name, value, labels, **extra):
+    event = {'ts': time.time(), 'kind': kind, 'name': name, 'value': value, 'labels': labels}
+    event.update(extra)
+    for sink in _sinks:
+        try:
+            sink.record(event)
+        except Exception as e:
+            logger.warning(f"Metrics sink {type(sink).__name__} failed: {e}")
+
+
+def span(name, **labels):
+    """Context manager timing the enclosed block as `name`."""
+    if not _enabled:
+        return _NOOP_SPAN
+    return Span(name, labels)
+
+
+def increment(name, value=1, **labels):
+    """Add value to the counter `name`."""
+    if _enabled:
+        _emit('counter', name, value, labels)
+
+
+def observe(name, value, **labels):
+    """Record one histogram observation for `name`."""
+    if _enabled:
+        _emit('observation', name, value, labels)
+
+
+def enable(*sinks):
+    """Start recording into the given sinks (replacing any configured before)."""
+    global _enabled
+    _sinks[:] = sinks
+    _enabled = bool(_sinks)
+
+
+def disable():
+    """Stop recording; hooks return immediately again."""
+    global _enabled
+    _enabled = False
+    _sinks[:] = []
+
+
+def is_enabled():
+    return _enabled
+
+
+def sinks():
+    """The sinks currently receiving events."""
+    return list(_sinks)
+
+
+def configure_from_env(variable='PIPELINE_METRICS'):
+    """Enable the sinks listed in an environment variable, if it is set."""
+    spec = os.environ.get(variable, '').strip()
+    if not spec:
+        return []
+    configured = []
+    for entry in spec.split(','):
+        entry = entry.strip()
+        if entry == 'memory':
+            configured.append(InMemorySink())
+        elif entry == 'prometheus':
+            configured.append(PrometheusSink())
+        elif entry.startswith('jsonl:'):
+            configured.append(JSONLinesSink(entry[len('jsonl:'):]))
+        elif entry:
+            logger.warning(f"Unknown metrics sink in ${variable}: {entry}")
+    if configured:
+        enable(*configured)
+    return configured
+
+
+configure_from_env()
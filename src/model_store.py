@@ -0,0 +1,509 @@
+"""
+Versioned, memory-mappable model artifact.
+
+An artifact is a directory instead of a pickle. Each save writes a new
+version subdirectory and then repoints the CURRENT file at it, so readers
+never see a half-written model; the previous version is kept until the
+following save for readers still opening it.
+
+    CURRENT                              name of the live version directory
+    v<timestamp>-<pid>/
+        manifest.json                    format version, vocabulary, analyzer and
+                                         build params, array dtypes/shapes and
+                                         sha256 checksums
+        <name>.npy                       dense arrays (movie_ids, item_factors, ...)
+        <name>.data/.indices/.indptr.npy CSR matrices
+        titles.offsets.npy, titles.bin   titles as one UTF-8 blob plus offsets
+
+Arrays are opened with np.load(mmap_mode='r') and allow_pickle=False, so
+loading runs no untrusted code, needs neither sklearn nor pandas, and
+worker processes share one page-cached copy. The row-normalised scoring
+matrix and the genre inverted index are stored precomputed, so opening a
+model does no per-row work.
+
+Usage:
+    python -m src.model_store convert models/genre_to_title_model.pkl models/genre_to_title_model
+    python -m src.model_store verify models/genre_to_title_model
+"""
+import argparse
+import hashlib
+import json
+import logging
+import mmap
+import os
+import pickle
+import re
+import shutil
+import time
+
+import numpy as np
+from scipy import sparse
+
+logger = logging.getLogger(__name__)
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_MODEL_PATH = os.path.join(project_root, 'models', 'genre_to_title_model')
+
+ARTIFACT_FORMAT = 'thought-to-title-model'
+ARTIFACT_VERSION = 1
+MANIFEST_NAME = 'manifest.json'
+POINTER_NAME = 'CURRENT'
+# Every store format written through publish_version starts with this
+STORE_FORMAT_PREFIX = 'thought-to-title-'
+
+DENSE_ARRAYS = ('movie_ids', 'item_factors', 'posting_ptr', 'posting_rows', 'posting_weights',
+                'group_ptr', 'group_rows')
+POPULARITY_COLUMNS = ('rating_count', 'rating_mean')
+PARAMS = ('format_version', 'built_at', 'cf_params', 'content_params')
+
+
+class TitleStore:
+    """
+    Read-only list of titles backed by a UTF-8 blob and an offsets array.
+
+    Title i is blob[offsets[i]:offsets[i + 1]], decoded on access, so a
+    memory-mapped store costs nothing until titles are actually returned.
+
+    Args:
+        offsets (np.ndarray): int64 array of len(titles) + 1 byte offsets.
+        blob (bytes-like): Every title back to back (bytes or an mmap).
+    """
+
+    def __init__(self, offsets, blob):
+        self.offsets = offsets
+        self.blob = blob
+
+    @classmethod
+    def from_strings(cls, titles):
+        encoded = [str(title).encode('utf-8') for title in titles]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(title) for title in encoded], out=offsets[1:])
+        return cls(offsets, b''.join(encoded))
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        # Slicing bytes/mmap copies just this title, no array objects involved
+        return str(self.blob[self.offsets[i]:self.offsets[i + 1]], 'utf-8')
+
+    def __iter__(self):
+        return (self[i] for i in range(len(self)))
+
+
+def make_analyzer(params):
+    """
+    Rebuild a word analyzer from stored params, without sklearn.
+
+    Matches CountVectorizer/TfidfVectorizer(analyzer='word', ngram_range=(1, 1))
+    with the given token_pattern, lowercase flag and stop words.
+    """
+    pattern = re.compile(params['token_pattern'])
+    lowercase = params['lowercase']
+    stop_words = frozenset(params.get('stop_words') or ())
+
+    def analyze(doc):
+        tokens = pattern.findall(doc.lower() if lowercase else doc)
+        return [token for token in tokens if token not in stop_words] if stop_words else tokens
+    return analyze
+
+
+def analyzer_params(vectorizer):
+    """Params for make_analyzer, taken from a fitted sklearn vectorizer."""
+    params = vectorizer.get_params()
+    if (params['analyzer'] != 'word' or tuple(params['ngram_range']) != (1, 1) or params['tokenizer']
+            or params['preprocessor'] or params['strip_accents']):
+        raise ValueError("Only word unigram vectorizers with the default tokenizer can be stored in an artifact")
+    stop_words = vectorizer.get_stop_words()
+    return {
+        'token_pattern': params['token_pattern'],
+        'lowercase': params['lowercase'],
+        'stop_words': sorted(stop_words) if stop_words else [],
+    }
+
+
+def scoring_arrays(genre_matrix):
+    """
+    Structures recommend_engine scores against, derived from the genre matrix.
+
+    Returns:
+        dict: normalized_matrix (row-normalised float64 CSR), the inverted
+        index (column c's posting list (sorted row ids) and normalised weights
+        live in posting_rows/posting_weights[posting_ptr[c]:posting_ptr[c + 1]])
+        and the row groups from row_groups().
+    """
+    genre_matrix = sparse.csr_matrix(genre_matrix, dtype=np.float64)
+    # Row-normalised matrix: cosine similarity becomes a single mat-vec.
+    row_norms = np.sqrt(np.asarray(genre_matrix.multiply(genre_matrix).sum(axis=1)).ravel())
+    row_norms[row_norms == 0] = 1.0
+    normalized_matrix = genre_matrix.multiply(1.0 / row_norms[:, None]).tocsr()
+    postings = normalized_matrix.tocsc()
+    postings.sort_indices()
+    arrays = {
+        'normalized_matrix': normalized_matrix,
+        'posting_ptr': postings.indptr,
+        'posting_rows': postings.indices,
+        'posting_weights': postings.data,
+    }
+    arrays.update(row_groups(normalized_matrix))
+    return arrays
+
+
+def row_groups(normalized_matrix):
+    """
+    Group rows with identical genre vectors.
+
+    A catalogue has far fewer distinct genre combinations than movies (about
+    a thousand in MovieLens), and rows in one group always score alike, so
+    genre-only ranking can score the groups and read rows off the best ones.
+
+    Returns:
+        dict: group_matrix (one CSR row per group), and group g's rows in
+        ascending order at group_rows[group_ptr[g]:group_ptr[g + 1]].
+    """
+    normalized_matrix = sparse.csr_matrix(normalized_matrix)
+    # Two random projections plus the entry count identify a row's vector;
+    # the check below catches the (practically impossible) collisions.
+    projections = np.random.default_rng(0).random((normalized_matrix.shape[1], 2))
+    keys = np.column_stack([normalized_matrix @ projections, np.diff(normalized_matrix.indptr)])
+    _, first, inverse = np.unique(keys, axis=0, return_index=True, return_inverse=True)
+    inverse = inverse.ravel()
+    mismatch = normalized_matrix - normalized_matrix[first[inverse]]
+    if mismatch.count_nonzero():
+        logger.warning("Genre vector hash collision; scoring every row on its own")
+        first = inverse = np.arange(normalized_matrix.shape[0])
+    counts = np.bincount(inverse, minlength=len(first))
+    return {
+        'group_matrix': normalized_matrix[first],
+        'group_ptr': np.concatenate([[0], np.cumsum(counts)]).astype(np.int64),
+        'group_rows': np.argsort(inverse, kind='stable').astype(np.int32),
+    }
+
+
+def _sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _write_array(directory, name, array, files):
+    array = np.ascontiguousarray(array)
+    filename = f'{name}.npy'
+    np.save(os.path.join(directory, filename), array, allow_pickle=False)
+    files[name] = {'file': filename, 'dtype': array.dtype.str, 'shape': list(array.shape)}
+
+
+def current_version(path):
+    """
+    Directory holding the live version of a versioned store.
+
+    Directories written before stores were versioned (files directly under
+    path, no CURRENT pointer) are returned unchanged.
+    """
+    try:
+        with open(os.path.join(path, POINTER_NAME)) as f:
+            name = f.read().strip()
+    except (FileNotFoundError, NotADirectoryError):
+        return path
+    return os.path.join(path, name)
+
+
+def new_version(path):
+    """Create an empty version subdirectory of path to write into (see publish_version)."""
+    os.makedirs(path, exist_ok=True)
+    version_path = os.path.join(path, f'v{time.time_ns()}-{os.getpid()}')
+    os.makedirs(version_path)
+    return version_path
+
+
+def _store_manifest(directory):
+    """The manifest of a store (model artifact or profile store) in directory, else None."""
+    try:
+        with open(os.path.join(directory, MANIFEST_NAME)) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(manifest, dict) or not str(manifest.get('format', '')).startswith(STORE_FORMAT_PREFIX):
+        return None
+    return manifest
+
+
+def publish_version(path, version_path):
+    """
+    Point path's CURRENT file at a fully written version directory.
+
+    Only the pointer file is replaced, so nothing is renamed underneath a
+    reader that has files open or memory-mapped (which Windows would refuse).
+    The previously live version is kept for readers that resolved the
+    pointer just before the switch; older ones, and the files of a
+    pre-versioning layout, are removed on a best-effort basis and retried
+    on the next publish if still in use. Only what a store wrote is
+    removed: version directories holding a store manifest, and the files
+    listed in a pre-versioning manifest. Assumes one writer at a time.
+    """
+    previous = current_version(path)
+    tmp_pointer = os.path.join(path, f'{POINTER_NAME}.tmp-{os.getpid()}')
+    with open(tmp_pointer, 'w') as f:
+        f.write(os.path.basename(version_path))
+    os.replace(tmp_pointer, os.path.join(path, POINTER_NAME))
+
+    if previous == path:
+        # Pre-versioning files are still the previous version; dropped next time
+        return
+    keep = {os.path.basename(version_path), os.path.basename(previous)}
+    for entry in os.scandir(path):
+        if (entry.name not in keep and entry.name.startswith('v') and entry.is_dir()
+                and _store_manifest(entry.path) is not None):
+            shutil.rmtree(entry.path, ignore_errors=True)
+
+    flat = _store_manifest(path)
+    if flat is not None and 'files' in flat:
+        names = [entry['file'] for entry in flat['files'].values()] + [MANIFEST_NAME]
+        for name in names:
+            try:
+                os.remove(os.path.join(path, name))
+            except OSError:
+                pass
+
+
+def save_artifact(model_components, path):
+    """
+    Write model components as a new version of an artifact directory.
+
+    The version is published only once complete (see publish_version), so
+    a running GenreRecommender never sees a half-written model.
+
+    Args:
+        model_components (dict): Components from src.build_model.build_model
+            (with a fitted 'vectorizer') or from load_model.
+        path (str): Artifact directory to create or replace.
+    """
+    if 'vectorizer' in model_components:
+        vectorizer = model_components['vectorizer']
+        vocabulary = [str(name) for name in vectorizer.get_feature_names_out()]
+        analyzer = analyzer_params(vectorizer)
+    else:
+        vocabulary = list(model_components['vocabulary'])
+        analyzer = model_components['analyzer_params']
+
+    titles = model_components.get('titles')
+    if titles is None:
+        titles = model_components['id_to_title'].to_numpy()
+    if not isinstance(titles, TitleStore):
+        titles = TitleStore.from_strings(titles)
+
+    arrays = dict(scoring_arrays(model_components['genre_matrix']))
+    arrays['genre_matrix'] = model_components['genre_matrix']
+    for name in ('movie_ids', 'item_factors', 'content_matrix', 'tag_counts'):
+        if model_components.get(name) is not None:
+            arrays[name] = model_components[name]
+    for column, values in (model_components.get('popularity') or {}).items():
+        arrays[f'popularity.{column}'] = values
+
+    path = os.path.abspath(path)
+    tmp_path = new_version(path)
+
+    files, matrices = {}, {}
+    for name, array in arrays.items():
+        if sparse.issparse(array):
+            array = sparse.csr_matrix(array)
+            matrices[name] = {'shape': list(array.shape)}
+            for part in ('data', 'indices', 'indptr'):
+                _write_array(tmp_path, f'{name}.{part}', getattr(array, part), files)
+        else:
+            _write_array(tmp_path, name, np.asarray(array), files)
+    _write_array(tmp_path, 'titles.offsets', titles.offsets, files)
+    with open(os.path.join(tmp_path, 'titles.bin'), 'wb') as f:
+        f.write(bytes(titles.blob))
+    files['titles.blob'] = {'file': 'titles.bin', 'dtype': '|u1', 'shape': [int(titles.offsets[-1])]}
+    for entry in files.values():
+        entry['sha256'] = _sha256(os.path.join(tmp_path, entry['file']))
+
+    manifest = {
+        'format': ARTIFACT_FORMAT,
+        'artifact_version': ARTIFACT_VERSION,
+        'written_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'vocabulary': vocabulary,
+        'analyzer': analyzer,
+        'params': {key: model_components.get(key) for key in PARAMS if model_components.get(key) is not None},
+        'num_titles': len(titles),
+        'matrices': matrices,
+        'files': files,
+    }
+    with open(os.path.join(tmp_path, MANIFEST_NAME), 'w') as f:
+        json.dump(manifest, f, indent=1)
+
+    publish_version(path, tmp_path)
+
+
+def read_manifest(path):
+    path = current_version(path)
+    with open(os.path.join(path, MANIFEST_NAME)) as f:
+        manifest = json.load(f)
+    if manifest.get('format') != ARTIFACT_FORMAT:
+        raise ValueError(f"{path} is not a model artifact")
+    if manifest.get('artifact_version', 0) > ARTIFACT_VERSION:
+        raise ValueError(f"Artifact version {manifest['artifact_version']} is newer than this code supports "
+                         f"({ARTIFACT_VERSION})")
+    return manifest
+
+
+def verify_artifact(path):
+    """
+    Check every file in an artifact against its manifest checksum.
+
+    Returns:
+        list: Names of files that are missing or do not match.
+    """
+    path = current_version(path)
+    manifest = read_manifest(path)
+    bad = []
+    for name, entry in manifest['files'].items():
+        file_path = os.path.join(path, entry['file'])
+        if not os.path.exists(file_path) or _sha256(file_path) != entry['sha256']:
+            bad.append(name)
+    return bad
+
+
+def load_artifact(path, mmap_mode='r', verify=False):
+    """
+    Open an artifact directory written by save_artifact.
+
+    Args:
+        path (str): Artifact directory (its live version is opened) or one
+            version subdirectory.
+        mmap_mode (str): Passed to np.load ('r' maps files read-only and shares
+            pages between processes; None reads everything into memory).
+        verify (bool): Check sha256 checksums first (reads every file).
+
+    Returns:
+        dict: Model components (see load_model).
+    """
+    path = current_version(path)
+    manifest = read_manifest(path)
+    if verify:
+        bad = verify_artifact(path)
+        if bad:
+            raise ValueError(f"Checksum mismatch in {path}: {', '.join(bad)}")
+
+    def array(name):
+        entry = manifest['files'][name]
+        loaded = np.load(os.path.join(path, entry['file']), mmap_mode=mmap_mode, allow_pickle=False)
+        if loaded.dtype.str != entry['dtype'] or list(loaded.shape) != entry['shape']:
+            raise ValueError(f"{entry['file']} does not match the manifest")
+        # Plain ndarray view of the mapping: np.memmap slices pay for
+        # subclass bookkeeping on every posting-list lookup
+        return np.asarray(loaded)
+
+    components = dict(manifest['params'])
+    components['vocabulary'] = manifest['vocabulary']
+    components['analyzer_params'] = manifest['analyzer']
+    components['analyzer'] = make_analyzer(manifest['analyzer'])
+
+    for name, info in manifest['matrices'].items():
+        components[name] = sparse.csr_matrix(
+            (array(f'{name}.data'), array(f'{name}.indices'), array(f'{name}.indptr')),
+            shape=tuple(info['shape']), copy=False)
+    for name in DENSE_ARRAYS:
+        if name in manifest['files']:
+            components[name] = array(name)
+    popularity = {column: array(f'popularity.{column}') for column in POPULARITY_COLUMNS
+                  if f'popularity.{column}' in manifest['files']}
+    if popularity:
+        components['popularity'] = popularity
+
+    blob_path = os.path.join(path, manifest['files']['titles.blob']['file'])
+    with open(blob_path, 'rb') as f:
+        if mmap_mode and os.path.getsize(blob_path):
+            blob = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            blob = f.read()
+    components['titles'] = TitleStore(array('titles.offsets'), blob)
+    return components
+
+
+def load_pickle(path):
+    """
+    Read a legacy pickled model and return it in load_model's shape.
+
+    Only load pickles from trusted sources; use convert_pickle to switch to
+    an artifact.
+    """
+    with open(path, 'rb') as f:
+        model_components = pickle.load(f)
+    vectorizer = model_components['vectorizer']
+    components = dict(model_components)
+    components['vocabulary'] = [str(name) for name in vectorizer.get_feature_names_out()]
+    components['analyzer'] = vectorizer.build_analyzer()
+    components['titles'] = np.asarray(model_components['id_to_title'].to_numpy(), dtype=object)
+    components.update(scoring_arrays(model_components['genre_matrix']))
+    return components
+
+
+def resolve_model_path(path):
+    """Return path, or the legacy "<path>.pkl" if only that exists."""
+    if not os.path.exists(path) and os.path.exists(path + '.pkl'):
+        return path + '.pkl'
+    return path
+
+
+def model_mtime(path):
+    """Modification time (ns) that changes whenever a model is rewritten."""
+    if os.path.isdir(path):
+        # Every save writes a new version with a fresh manifest
+        return os.stat(os.path.join(current_version(path), MANIFEST_NAME)).st_mtime_ns
+    return os.stat(path).st_mtime_ns
+
+
+def load_model(path, mmap_mode='r'):
+    """
+    Load model components from an artifact directory or a legacy pickle.
+
+    Returns:
+        dict: At least vocabulary, analyzer, genre_matrix, titles,
+        normalized_matrix and posting_ptr/posting_rows/posting_weights; plus
+        format_version, movie_ids, popularity, item_factors, content_matrix,
+        tag_counts and build params when the model has them.
+    """
+    path = resolve_model_path(path)
+    if os.path.isdir(path):
+        return load_artifact(path, mmap_mode)
+    logger.warning(f"Loading legacy pickle {path}; convert it with `python -m src.model_store convert`")
+    return load_pickle(path)
+
+
+def convert_pickle(pickle_path, artifact_path):
+    """Convert a legacy pickled model into an artifact directory."""
+    with open(pickle_path, 'rb') as f:
+        model_components = pickle.load(f)
+    save_artifact(model_components, artifact_path)
+    return artifact_path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Convert or verify model artifacts.")
+    commands = parser.add_subparsers(dest='command', required=True)
+    convert = commands.add_parser('convert', help="Convert a pickled model into an artifact directory")
+    convert.add_argument('pickle_path')
+    convert.add_argument('artifact_path')
+    verify = commands.add_parser('verify', help="Check an artifact's checksums")
+    verify.add_argument('artifact_path')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    if args.command == 'convert':
+        convert_pickle(args.pickle_path, args.artifact_path)
+        logger.info(f"Wrote {args.artifact_path}")
+        return 0
+    bad = verify_artifact(args.artifact_path)
+    if bad:
+        logger.error(f"Checksum mismatch: {', '.join(bad)}")
+        return 1
+    logger.info(f"{args.artifact_path} is intact")
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -1,126 +1,659 @@
-import pickle
 import numpy as np
-from sklearn.metrics.pairwise import cosine_similarity
-import os
 import logging
+import threading
+
+from . import metrics
+from .cache import LRUCache
+from .collaborative import normalize_rows
+from .genre_mapping import compile_label_matrix
+from .item_index import ExactIndex
+from .model_store import DEFAULT_MODEL_PATH, current_version, load_model, model_mtime, resolve_model_path, row_groups
+from .user_profiles import DEFAULT_PROFILE_PATH, load_profiles, profiles_mtime
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-def recommend_engine(predicted_genres, top_k=5, strict_genre_match=True):
+SCORING_MODES = ('genre', 'hybrid')
+# Hybrid scoring: the best genre matches that form the collaborative
+# centroid, and the rating count at which a title's factors are trusted half
+CENTROID_SIZE = 50
+CONFIDENCE_PRIOR = 20.0
+
+
+class ModelState:
+    """
+    Everything GenreRecommender derives from one model artifact.
+
+    A state is fully built before it is published and is not modified
+    afterwards (apart from the memoised genre-name lookups), so a request
+    that reads the recommender's state once sees a single consistent model
+    even while a reload swaps in the next one.
+
+    Args:
+        model_components (dict): Components from src.model_store.load_model.
+        mtime (int): Model modification time, used as its version.
+    """
+
+    def __init__(self, model_components, mtime):
+        # Genre -> column index; the analyzer maps raw genre names such as
+        # "Sci-Fi" onto the same tokens the matrix was built from.
+        self.genre_index = {str(name): int(idx) for idx, name in
+                            enumerate(model_components['vocabulary'])}
+        self._analyzer = model_components['analyzer']
+        self._genre_columns = {}
+        # NLP label -> model column weights, so a label score vector turns
+        # into a query vector with one sparse mat-vec
+        self.label_index, label_matrix = compile_label_matrix(self.columns_for, len(self.genre_index))
+        self._label_matrix_t = label_matrix.T.tocsr()
+
+        # Row-normalised matrix (cosine similarity is a single mat-vec) and
+        # the inverted index: column c's posting list (sorted row ids) and
+        # the matching normalised weights live in indptr[c]:indptr[c + 1].
+        self.genre_matrix = model_components['genre_matrix']
+        self.normalized_matrix = model_components['normalized_matrix']
+        self.posting_ptr = model_components['posting_ptr']
+        self.posting_rows = model_components['posting_rows']
+        self.posting_weights = model_components['posting_weights']
+        # Rows with identical genre vectors (written by newer artifacts)
+        if 'group_ptr' not in model_components:
+            model_components.update(row_groups(self.normalized_matrix))
+        self.group_matrix = model_components['group_matrix']
+        self.group_ptr = model_components['group_ptr']
+        self.group_rows = model_components['group_rows']
+        self.group_sizes = np.diff(self.group_ptr)
+        self.titles = model_components['titles']
+        # Per-thread scratch arrays for merging posting lists
+        self._scratch = threading.local()
+        # Side columns written by src.build_model (absent from older pickles)
+        self.format_version = model_components.get('format_version', 1)
+        self.movie_ids = model_components.get('movie_ids')
+        self.popularity = model_components.get('popularity', {})
+        item_factors = model_components.get('item_factors')
+        self.item_factors = normalize_rows(item_factors) if item_factors is not None else None
+        self.confidence = self._confidence(item_factors)
+        # Genre+tag content vectors (src.content_model) for item-to-item queries
+        content_matrix = model_components.get('content_matrix')
+        if content_matrix is not None:
+            self.content_index = ExactIndex(content_matrix, normalized=True)
+        else:
+            self.content_index = ExactIndex(self.normalized_matrix, normalized=True)
+        self.mtime = mtime
+        self.model_version = (self.format_version, mtime)
+
+    def _confidence(self, item_factors):
+        """
+        How far each title's item factors can be trusted, in [0, 1]: count
+        shrinkage n / (n + CONFIDENCE_PRIOR) over its n training ratings, or
+        the raw factor norm relative to the largest for models without
+        rating counts (SVD norms grow with the evidence behind a row).
+        """
+        if item_factors is None:
+            return None
+        counts = self.popularity.get('rating_count')
+        if counts is not None:
+            counts = np.asarray(counts, dtype=np.float64)
+            return counts / (counts + CONFIDENCE_PRIOR)
+        norms = np.linalg.norm(item_factors, axis=1)
+        return norms / norms.max() if norms.max() > 0 else norms
+
+    def columns_for(self, genre):
+        """Return the matrix columns that represent a genre name (cached)."""
+        columns = self._genre_columns.get(genre)
+        if columns is None:
+            if genre in self.genre_index:
+                columns = (self.genre_index[genre],)
+            else:
+                columns = tuple(self.genre_index[token] for token in self._analyzer(genre)
+                                if token in self.genre_index)
+            self._genre_columns[genre] = columns
+        return columns
+
+    def postings(self, column):
+        """Sorted row indices of the movies that carry a genre column."""
+        return self.posting_rows[self.posting_ptr[column]:self.posting_ptr[column + 1]]
+
+    def build_query(self, genres):
+        """
+        Turn genre labels into a query vector over the model's columns.
+
+        Labels from the NLP vocabulary (e.g. "Sci-Fi Horror") go through the
+        compiled label matrix; anything else is matched against the model
+        columns directly.
+
+        Args:
+            genres (list or dict): Genre labels, or a label:score mapping.
+
+        Returns:
+            tuple: (query vector, set of genres that matched nothing)
+        """
+        weights = genres if isinstance(genres, dict) else dict.fromkeys(genres, 1.0)
+        label_scores = np.zeros(len(self.label_index))
+        query = np.zeros(len(self.genre_index))
+        unknown_genres = set()
+        for genre, weight in weights.items():
+            label = self.label_index.get(genre)
+            if label is not None:
+                label_scores[label] += weight
+                continue
+            columns = self.columns_for(genre)
+            if columns:
+                query[list(columns)] += weight
+            else:
+                unknown_genres.add(genre)
+        query += self._label_matrix_t @ label_scores
+        return query, unknown_genres
+
+    def group_rows_of(self, group, limit=None):
+        """Rows of a group in ascending order (at most limit of them)."""
+        start, stop = self.group_ptr[group], self.group_ptr[group + 1]
+        return self.group_rows[start:stop if limit is None else min(stop, start + limit)]
+
+    def score_candidates(self, columns, query):
+        """
+        Score the union of the posting lists for the given columns.
+
+        The work is linear in the posting list sizes, not in the catalogue:
+        per-thread scratch arrays are only touched at the candidate rows and
+        reset afterwards.
+
+        Returns:
+            tuple: (candidate row indices, their dot products with query)
+        """
+        spans = [slice(self.posting_ptr[c], self.posting_ptr[c + 1]) for c in columns]
+        if len(spans) == 1:
+            # A single posting list is already the candidate set
+            return self.posting_rows[spans[0]], self.posting_weights[spans[0]] * query[columns[0]]
+
+        scratch = self._scratch
+        if getattr(scratch, 'accumulator', None) is None:
+            scratch.accumulator = np.zeros(len(self.titles))
+            scratch.slot = np.zeros(len(self.titles), dtype=np.int64)
+        accumulator, slot = scratch.accumulator, scratch.slot
+        # Rows are unique within one posting list, so per-list += is exact
+        for column, span in zip(columns, spans):
+            accumulator[self.posting_rows[span]] += self.posting_weights[span] * query[column]
+        # Deduplicate the concatenated lists without sorting: keep each row
+        # at the position its last write to slot landed on
+        rows = np.concatenate([self.posting_rows[span] for span in spans])
+        positions = np.arange(len(rows))
+        slot[rows] = positions
+        candidates = rows[slot[rows] == positions]
+        scores = accumulator[candidates]
+        accumulator[candidates] = 0.0
+        return candidates, scores
+
+    def collaborative_scores(self, rows, genre_scores):
+        """
+        Collaborative score for rows, in [0, 1].
+
+        The best CENTROID_SIZE genre matches act as a pseudo-user: their item
+        factors, weighted by genre similarity and confidence, form a
+        centroid. Each row scores its cosine similarity to the centroid
+        scaled by its own confidence, so titles with a handful of ratings
+        (whose normalised factors are mostly noise) cannot outrank
+        established ones. Rows without factors (never rated) score 0.
+        """
+        factors = self.item_factors[rows]
+        confidence = self.confidence[rows]
+        top = np.arange(len(rows))
+        if len(rows) > CENTROID_SIZE:
+            # Many rows share a genre vector: break ties at the cut-off by
+            # row, so the centroid does not depend on candidate order
+            cutoff = np.partition(genre_scores, len(rows) - CENTROID_SIZE)[len(rows) - CENTROID_SIZE]
+            above = np.flatnonzero(genre_scores > cutoff)
+            tied = np.flatnonzero(genre_scores == cutoff)
+            tied = tied[np.argsort(rows[tied])[:CENTROID_SIZE - len(above)]]
+            top = np.concatenate([above, tied])
+        centroid = (genre_scores[top] * confidence[top]) @ factors[top]
+        norm = np.linalg.norm(centroid)
+        if norm == 0:
+            return np.zeros(len(rows))
+        scores = confidence * (factors @ (centroid / norm) + 1.0) / 2.0
+        scores[~factors.any(axis=1)] = 0.0
+        return scores
+
+
+def _state_property(name):
+    return property(lambda self: getattr(self._state, name),
+                    doc=f"{name} of the currently loaded model (see ModelState).")
+
+
+class GenreRecommender:
+    """
+    Resident genre-to-title recommender.
+
+    Opens the model artifact once (memory-mapped, see src.model_store) and
+    keeps the lookup structures resident, so each request only builds a
+    query vector and scores it. The model is re-opened automatically when
+    it is rewritten on disk; the new ModelState replaces the old one with a
+    single reference swap, and each request reads that reference once.
+
+    Deterministic results are memoised in an LRU cache keyed by the
+    canonical genre set, top_k, strict flag, user and model version; the
+    cache is cleared whenever the model is reloaded.
+
+    Requests with a user_id are personalised from the profile store
+    (src.user_profiles), opened on first use and re-opened when rewritten.
+
+    Args:
+        model_path (str): Model artifact directory (or a legacy pickle).
+        cache_size (int): Maximum number of cached results (0 disables caching).
+        cache_ttl (float): Seconds a cached result stays valid (None means no expiry).
+        hybrid_weight (float): Share of the collaborative score in "hybrid" scoring.
+        profile_path (str): User profile store directory.
+        personal_weight (float): Share of the user's genre affinity in personalised scores.
+    """
+
+    genre_index = _state_property('genre_index')
+    label_index = _state_property('label_index')
+    genre_matrix = _state_property('genre_matrix')
+    normalized_matrix = _state_property('normalized_matrix')
+    titles = _state_property('titles')
+    format_version = _state_property('format_version')
+    movie_ids = _state_property('movie_ids')
+    popularity = _state_property('popularity')
+    item_factors = _state_property('item_factors')
+    content_index = _state_property('content_index')
+    model_version = _state_property('model_version')
+
+    def __init__(self, model_path=DEFAULT_MODEL_PATH, cache_size=1024, cache_ttl=None, hybrid_weight=0.3,
+                 profile_path=DEFAULT_PROFILE_PATH, personal_weight=0.3):
+        self.model_path = model_path
+        self.hybrid_weight = hybrid_weight
+        self.profile_path = profile_path
+        self.personal_weight = personal_weight
+        # (store, mtime, state it was checked against), replaced as a whole
+        self._profiles = None
+        self._lock = threading.Lock()
+        self._state = None
+        self.cache = LRUCache(cache_size, cache_ttl)
+        self.load()
+
+    def load(self):
+        """Open the model and publish a new ModelState for scoring."""
+        with self._lock, metrics.span('recommend_model_load'):
+            # Pin one version, so the mtime matches what is loaded
+            path = current_version(resolve_model_path(self.model_path))
+            mtime = model_mtime(path)
+            state = ModelState(load_model(path), mtime)
+            self._state = state
+            self.cache.clear()
+
+        logger.info(f"Loaded model from {self.model_path} ({len(state.titles)} titles)")
+
+    def reload_if_changed(self):
+        """Reload the model if the file on disk changed since the last load."""
+        try:
+            mtime = model_mtime(resolve_model_path(self.model_path))
+        except FileNotFoundError:
+            return False
+        if mtime != self._state.mtime:
+            logger.info("Model file changed on disk, reloading")
+            self.load()
+            return True
+        return False
+
+    # Convenience wrappers over the current state
+    def columns_for(self, genre):
+        """Return the matrix columns that represent a genre name (cached)."""
+        return self._state.columns_for(genre)
+
+    def postings(self, column):
+        """Sorted row indices of the movies that carry a genre column."""
+        return self._state.postings(column)
+
+    def build_query(self, genres):
+        """Turn genre labels into a query vector (see ModelState.build_query)."""
+        return self._state.build_query(genres)
+
+    @property
+    def profiles(self):
+        """The user profile store last opened, or None."""
+        current = self._profiles
+        return current[0] if current is not None else None
+
+    def load_profiles(self, state=None):
+        """
+        Return the user profile store, re-opening it if it changed on disk.
+
+        Args:
+            state (ModelState): Model the store must match (default: the current one).
+
+        Returns:
+            tuple: (UserProfileStore, mtime), or None if no store has been built.
+        """
+        state = state or self._state
+        path = current_version(self.profile_path)
+        try:
+            mtime = profiles_mtime(path)
+        except FileNotFoundError:
+            return None
+        current = self._profiles
+        if current is None or current[1] != mtime or current[2] is not state:
+            with self._lock:
+                if current is not None and current[1] == mtime:
+                    store = current[0]
+                else:
+                    store = load_profiles(path)
+                    logger.info(f"Loaded {len(store)} user profiles from {self.profile_path}")
+                if state.movie_ids is None or not np.array_equal(store.movie_ids, state.movie_ids):
+                    raise ValueError("User profiles were built against a different model; "
+                                     "rebuild them with src.user_profiles")
+                current = self._profiles = (store, mtime, state)
+        return current[0], current[1]
+
+    def _personalization(self, user_id, state):
+        """
+        (store, profile row, cache key part) for user_id, or None (with a
+        warning) if the user has no profile.
+        """
+        opened = self.load_profiles(state)
+        row = opened[0].row(user_id) if opened is not None else None
+        if row is None:
+            logger.warning(f"No profile for user {user_id}, returning unpersonalised results")
+            metrics.increment('recommend_fallback', reason='unknown_user')
+            return None
+        store, mtime = opened
+        return store, row, (row, mtime, store.version)
+
+    @staticmethod
+    def _random_rows(pool, top_k, exclude=None, rng=None):
+        """
+        Up to top_k random rows from pool (an int means range(pool)), minus
+        exclude, drawn from rng (a np.random.Generator; default: np.random).
+        """
+        if exclude is not None and len(exclude):
+            pool = np.arange(pool) if np.isscalar(pool) else pool
+            pool = pool[~np.isin(pool, exclude)]
+        size = pool if np.isscalar(pool) else len(pool)
+        picked = (rng or np.random).choice(size, min(top_k, size), replace=False)
+        return picked if np.isscalar(pool) else pool[picked]
+
+    @staticmethod
+    def _top_k(scores, top_k, rows):
+        """Indices of the top_k scores, best first (ties by row), without a full sort."""
+        if top_k >= len(scores):
+            return np.lexsort((rows, -scores))
+        top = np.argpartition(-scores, top_k - 1)[:top_k]
+        return top[np.lexsort((rows[top], -scores[top]))]
+
+    def more_like_this(self, movie_id, top_k=5):
+        """
+        Titles whose content vectors are closest to a given movie.
+
+        Args:
+            movie_id (int): MovieLens movieId (requires a model built by src.build_model).
+            top_k (int): Number of titles to return, excluding the movie itself.
+
+        Returns:
+            list: Titles of similar movies.
+        """
+        self.reload_if_changed()
+        state = self._state
+        if state.movie_ids is None:
+            raise ValueError("Model has no movie_ids; rebuild it with src.build_model")
+        row = np.flatnonzero(state.movie_ids == movie_id)
+        if len(row) == 0:
+            raise KeyError(f"Unknown movieId: {movie_id}")
+        indices, _ = state.content_index.query(state.content_index.vectors[row[0]], k=top_k + 1)
+        return [state.titles[i] for i in indices[0] if i != row[0]][:top_k]
+
+    def recommend(self, genres, top_k=5, strict=True, scoring='genre', user_id=None):
+        """
+        Recommend movies based on input genres.
+
+        Args:
+            genres (list or dict): List of genre strings, or a genre:score
+                mapping (e.g. the scores from convert_thought_to_genres).
+            top_k (int): Number of recommendations to return.
+            strict (bool): If True, only recommend movies with at least one matching genre.
+            scoring (str): "genre" ranks by genre cosine similarity only;
+                "hybrid" blends in the collaborative-filtering item factors.
+            user_id (int): MovieLens userId; re-ranks by the user's genre
+                affinity and drops titles they have already rated.
+
+        Returns:
+            list: Titles of recommended movies.
+        """
+        if scoring not in SCORING_MODES:
+            raise ValueError(f"Unknown scoring mode: {scoring}")
+        if top_k < 1:
+            raise ValueError(f"top_k must be at least 1, got {top_k}")
+        with metrics.span('recommend', scoring=scoring, strict=bool(strict)):
+            return self._recommend(genres, top_k, strict, scoring, user_id)
+
+    def _recommend(self, genres, top_k, strict, scoring, user_id=None):
+        self.reload_if_changed()
+        state = self._state
+        personal = self._personalization(user_id, state) if user_id is not None else None
+
+        if isinstance(genres, dict):
+            canonical = tuple(sorted((genre, round(float(score), 4)) for genre, score in genres.items()))
+        else:
+            canonical = tuple(sorted(set(genres)))
+        key = (canonical, top_k, bool(strict), scoring, personal and personal[2], state.model_version)
+        cached = self.cache.get(key)
+        if cached is not None:
+            metrics.increment('recommend_cache', result='hit')
+            return list(cached)
+        metrics.increment('recommend_cache', result='miss')
+
+        rows, deterministic = self._rank(state, genres, top_k, strict, scoring, personal)
+        with metrics.span('recommend_titles'):
+            titles = [state.titles[i] for i in rows] or ["No recommendations found"]
+        # Random fallbacks are never cached, so a repeated query can still
+        # land on a different sample
+        if deterministic:
+            self.cache.put(key, tuple(titles))
+        return titles
+
+    def rank_rows(self, genres, top_k=5, strict=True, scoring='genre', user_id=None, rng=None):
+        """
+        Like recommend(), but uncached and returning model row indices
+        (e.g. for offline evaluation against rating data). Random fallbacks
+        draw from rng (a np.random.Generator) if given, for reproducibility.
+
+        Returns:
+            np.ndarray: Row indices of the recommended movies, best first.
+        """
+        if scoring not in SCORING_MODES:
+            raise ValueError(f"Unknown scoring mode: {scoring}")
+        if top_k < 1:
+            raise ValueError(f"top_k must be at least 1, got {top_k}")
+        self.reload_if_changed()
+        state = self._state
+        personal = self._personalization(user_id, state) if user_id is not None else None
+        rows, _ = self._rank(state, genres, top_k, strict, scoring, personal, rng)
+        return rows
+
+    def _rank(self, state, genres, top_k, strict, scoring='genre', personal=None, rng=None):
+        """
+        Score and rank titles for a genre list against one model state,
+        personalised if personal (from _personalization) is given.
+
+        Genre-only scoring ranks row groups (rows with identical genre
+        vectors) and reads rows off the best groups, so its cost does not
+        grow with the catalogue; hybrid scoring needs per-row collaborative
+        scores and ranks the posting-list candidates. Loose mode ranks the
+        genre matches first and fills any remaining slots with other titles.
+
+        Returns:
+            tuple: (row indices best first, True if the result is deterministic)
+        """
+        # --- 1. Validate Input Genres ---
+        with metrics.span('recommend_query'):
+            query, unknown_genres = state.build_query(genres)
+        if unknown_genres:
+            logger.warning(f"Unknown genres: {unknown_genres}")
+            metrics.increment('recommend_unknown_genres', len(unknown_genres))
+
+        input_columns = np.flatnonzero(query)
+        seen = personal[0].seen(personal[1]) if personal is not None else None
+        if len(input_columns) == 0:
+            logger.warning("No valid genres found after filtering")
+            metrics.increment('recommend_fallback', reason='no_valid_genres')
+            # Fallback: return random popular movies
+            return self._random_rows(len(state.titles), top_k, seen, rng), False
+
+        if scoring == 'hybrid' and state.item_factors is None:
+            logger.warning("Model has no item factors, using genre scores only")
+            metrics.increment('recommend_fallback', reason='no_item_factors')
+            scoring = 'genre'
+        if scoring == 'hybrid':
+            return self._rank_candidates(state, query, input_columns, top_k, strict, personal, seen, rng)
+        return self._rank_groups(state, query, top_k, strict, personal, seen, rng)
+
+    def _rank_groups(self, state, query, top_k, strict, personal, seen, rng=None):
+        """Genre-only ranking over row groups (see _rank)."""
+        # --- 2. Candidate Generation ---
+        with metrics.span('recommend_score'):
+            group_scores = state.group_matrix @ (query / np.linalg.norm(query))
+            groups = np.flatnonzero(group_scores > 0)
+        n_candidates = int(state.group_sizes[groups].sum())
+        metrics.observe('recommend_candidates', n_candidates)
+
+        # --- 3. Genre Matching Filter ---
+        if strict:
+            if n_candidates > 0:
+                logger.info(f"Found {n_candidates} movies matching the genres")
+            else:
+                logger.warning("No movies found with matching genres, falling back to all movies")
+                metrics.increment('recommend_fallback', reason='no_strict_matches')
+                return self._random_rows(len(state.titles), top_k, seen, rng), False
+        else:
+            # Non-matching groups score 0, so they only fill the remaining slots
+            groups = np.arange(len(state.group_sizes))
+        scores = group_scores[groups]
+
+        if personal is not None:
+            profiles, profile_row, _ = personal
+            with metrics.span('recommend_personalize'):
+                # Rows in a group share a genre vector, hence the user's affinity
+                affinity = state.group_matrix[groups] @ profiles.affinity[profile_row]
+                scores = (1.0 - self.personal_weight) * scores + self.personal_weight * affinity
+
+        # --- 4. Rank ---
+        # Handle case where all similarities are the same (e.g., all zeros)
+        if np.all(scores == scores[0]):
+            logger.warning("All cosine similarities are equal, returning random selection")
+            metrics.increment('recommend_fallback', reason='tied_scores')
+            pool = np.concatenate([state.group_rows_of(g) for g in groups])
+            return self._random_rows(pool, top_k, seen, rng), False
+
+        with metrics.span('recommend_rank'):
+            picked, needed = [], top_k
+            for group in groups[np.argsort(-scores, kind='stable')]:
+                if seen is None:
+                    rows = state.group_rows_of(group, needed)
+                else:
+                    # Already-rated titles are dropped as the groups are read
+                    rows = state.group_rows_of(group, needed + len(seen))
+                    rows = rows[~np.isin(rows, seen)][:needed]
+                picked.append(rows)
+                needed -= len(rows)
+                if needed <= 0:
+                    break
+        return (np.concatenate(picked) if picked else np.empty(0, dtype=np.int64)), True
+
+    def _rank_candidates(self, state, query, input_columns, top_k, strict, personal, seen, rng=None):
+        """Per-row ranking of the posting-list candidates (see _rank)."""
+        # --- 2. Candidate Generation ---
+        with metrics.span('recommend_score'):
+            candidates, scores = state.score_candidates(input_columns, query)
+        metrics.observe('recommend_candidates', len(candidates))
+        # Cosine similarity against the normalised query vector
+        cosine_similarities = scores / np.linalg.norm(query)
+
+        # --- 3. Genre Matching Filter ---
+        if len(candidates) == 0:
+            if strict:
+                logger.warning("No movies found with matching genres, falling back to all movies")
+                metrics.increment('recommend_fallback', reason='no_strict_matches')
+            return self._random_rows(len(state.titles), top_k, seen, rng), False
+        if strict:
+            logger.info(f"Found {len(candidates)} movies matching the genres")
+
+        cosine_similarities = ((1.0 - self.hybrid_weight) * cosine_similarities
+                               + self.hybrid_weight * state.collaborative_scores(candidates, cosine_similarities))
+
+        if personal is not None:
+            profiles, profile_row, _ = personal
+            with metrics.span('recommend_personalize'):
+                # Drop already-rated titles, then blend in the user's affinity
+                # for each remaining candidate's genres (candidate rows only)
+                unseen = ~np.isin(candidates, seen)
+                candidates = candidates[unseen]
+                cosine_similarities = cosine_similarities[unseen]
+                affinity = state.normalized_matrix[candidates] @ profiles.affinity[profile_row]
+                cosine_similarities = ((1.0 - self.personal_weight) * cosine_similarities
+                                       + self.personal_weight * affinity)
+
+        # --- 4. Rank ---
+        deterministic = len(candidates) == 0 or not np.all(cosine_similarities == cosine_similarities[0])
+        if not deterministic:
+            logger.warning("All cosine similarities are equal, returning random selection")
+            metrics.increment('recommend_fallback', reason='tied_scores')
+            rows = self._random_rows(candidates, top_k, rng=rng)
+        else:
+            with metrics.span('recommend_rank'):
+                rows = candidates[self._top_k(cosine_similarities, top_k, candidates)]
+
+        if not strict and len(rows) < top_k:
+            # Fill the remaining slots with non-matching titles in catalogue order
+            taken = np.concatenate([candidates, seen]) if seen is not None else candidates
+            pool = np.arange(min(len(state.titles), top_k + len(taken)))
+            rows = np.concatenate([rows, pool[~np.isin(pool, taken)][:top_k - len(rows)]])
+        return rows, deterministic
+
+
+_default_recommender = None
+_default_lock = threading.Lock()
+
+
+def get_recommender(model_path=DEFAULT_MODEL_PATH):
+    """Return the process-wide GenreRecommender, loading it on first use."""
+    global _default_recommender
+    if _default_recommender is None or _default_recommender.model_path != model_path:
+        with _default_lock:
+            if _default_recommender is None or _default_recommender.model_path != model_path:
+                _default_recommender = GenreRecommender(model_path)
+    return _default_recommender
+
+
+def recommend_engine(predicted_genres, top_k=5, strict_genre_match=True, scoring='genre', user_id=None):
     """
     Recommend movies based on input genres.
 
+    Thin wrapper over the module-level GenreRecommender, so the model is only
+    loaded from disk on the first call (or when the file changes).
+
     Args:
-        predicted_genres (list): List of genre strings.
+        predicted_genres (list or dict): List of genre strings, or a genre:score mapping.
         top_k (int): Number of recommendations to return.
         strict_genre_match (bool): If True, only recommend movies with at least one matching genre.
+        scoring (str): "genre" or "hybrid" (genre similarity blended with
+            collaborative-filtering item factors).
+        user_id (int): Optional MovieLens userId to personalise for.
 
     Returns:
         list: Titles of recommended movies.
     """
     # --- 1. Load Model ---
     try:
-        script_dir = os.path.dirname(os.path.abspath(__file__))
-        project_root = os.path.dirname(script_dir)
-        model_path = os.path.join(project_root, 'models', 'genre_to_title_model.pkl')
-        with open(model_path, 'rb') as f:
-            model_components = pickle.load(f)
+        recommender = get_recommender()
     except FileNotFoundError:
+        metrics.increment('recommend_errors', stage='load')
         return ["Error: Model file not found. Please run the training script first."]
     except Exception as e:
+        metrics.increment('recommend_errors', stage='load')
         return [f"Error loading model: {str(e)}"]
 
-    vectorizer = model_components['vectorizer']
-    genre_matrix = model_components['genre_matrix']
-    id_to_title_map = model_components['id_to_title']
-
-    # --- 2. Validate Input Genres ---
-    all_genres = set(vectorizer.get_feature_names_out())
-    unknown_genres = set(predicted_genres) - all_genres
-    if unknown_genres:
-        logger.warning(f"Unknown genres: {unknown_genres}")
-
-    known_genres = [g for g in predicted_genres if g in all_genres]
-    
-    if not known_genres:
-        logger.warning("No valid genres found after filtering")
-        # Fallback: return random popular movies
-        indices = np.random.choice(len(id_to_title_map), min(top_k, len(id_to_title_map)), replace=False)
-        return [id_to_title_map.iloc[i] for i in indices]
-
-    # --- 3. Build Input Vector ---
-    input_vector = np.zeros((1, len(all_genres)))
-    for genre in known_genres:
-        try:
-            idx = list(all_genres).index(genre)
-            input_vector[0, idx] = 1
-        except ValueError:
-            logger.warning(f"Genre {genre} not found in vectorizer features")
-
-    # --- 4. Genre Matching Filter ---
-    valid_indices = np.arange(len(genre_matrix))
-    filtered_genre_matrix = genre_matrix
-    
-    if strict_genre_match:
-        try:
-            genre_columns = vectorizer.get_feature_names_out()
-            input_mask = np.array([genre in known_genres for genre in genre_columns])
-            
-            # Check if any genres match
-            matching_rows_mask = genre_matrix[:, input_mask].sum(axis=1) > 0
-            valid_indices = np.where(matching_rows_mask)[0]
-            
-            if len(valid_indices) > 0:
-                filtered_genre_matrix = genre_matrix[valid_indices]
-                logger.info(f"Found {len(valid_indices)} movies matching the genres")
-            else:
-                logger.warning("No movies found with matching genres, falling back to all movies")
-                # Fallback to all movies when no matches found
-                valid_indices = np.arange(len(genre_matrix))
-                filtered_genre_matrix = genre_matrix
-                
-        except Exception as e:
-            logger.error(f"Error in genre filtering: {e}")
-            # Fallback to all movies
-            valid_indices = np.arange(len(genre_matrix))
-            filtered_genre_matrix = genre_matrix
-
-    # --- 5. Compute Similarity ---
-    try:
-        if filtered_genre_matrix.shape[0] == 0:
-            logger.error("Filtered genre matrix is empty")
-            # Ultimate fallback
-            indices = np.random.choice(len(id_to_title_map), min(top_k, len(id_to_title_map)), replace=False)
-            return [id_to_title_map.iloc[i] for i in indices]
-            
-        cosine_similarities = cosine_similarity(input_vector, filtered_genre_matrix).flatten()
-        
-        # Handle case where all similarities are the same (e.g., all zeros)
-        if np.all(cosine_similarities == cosine_similarities[0]):
-            logger.warning("All cosine similarities are equal, returning random selection")
-            top_indices_in_filtered = np.random.choice(
-                len(valid_indices), 
-                size=min(top_k, len(valid_indices)), 
-                replace=False
-            )
-        else:
-            top_indices_in_filtered = np.argsort(cosine_similarities)[::-1][:top_k]
-            
-        top_indices = valid_indices[top_indices_in_filtered]
-        
-    except Exception as e:
-        logger.error(f"Error computing similarities: {e}")
-        # Final fallback
-        indices = np.random.choice(len(id_to_title_map), min(top_k, len(id_to_title_map)), replace=False)
-        return [id_to_title_map.iloc[i] for i in indices]
-
-    # --- 6. Return Titles ---
     try:
-        recommended_titles = [id_to_title_map.iloc[i] for i in top_indices]
-        return recommended_titles if recommended_titles else ["No recommendations found"]
+        return recommender.recommend(predicted_genres, top_k=top_k, strict=strict_genre_match, scoring=scoring,
+                                     user_id=user_id)
     except Exception as e:
-        logger.error(f"Error retrieving titles: {e}")
+        logger.error(f"Error computing recommendations: {e}")
+        metrics.increment('recommend_errors', stage='rank')
         return ["Error retrieving movie titles"]
 
 # --- Example Usage ---
@@ -128,4 +661,4 @@ if __name__ == '__main__':
     # Test the function
     test_genres = ['Action', 'Adventure']
     recommendations = recommend_engine(test_genres, top_k=3)
-    print(f"Recommendations for {test_genres}: {recommendations}")
\ No newline at end of file
+    print(f"Recommendations for {test_genres}: {recommendations}")
@@ -0,0 +1,262 @@
+"""
+HTTP service around the thought -> genres -> titles pipeline.
+
+Usage:
+    python -m src.serve [--host 127.0.0.1] [--port 8000] [--max-batch-size 8]
+                        [--max-wait-ms 10] [--max-queue 64] [--workers 1]
+
+Endpoints (JSON in, JSON out):
+    POST /genres            {"text", "threshold"}
+    POST /recommend         {"genres", "top_k", "strict", "scoring", "user_id"}
+    POST /thought-to-titles {"text", "threshold", "top_k", "strict", "scoring", "user_id"}
+    GET  /metrics           Prometheus text format (with --metrics or
+                            PIPELINE_METRICS=prometheus)
+
+NLP inference runs on dedicated worker threads that micro-batch concurrent
+requests into one forward pass; recommender lookups run inline. Every
+response carries a Server-Timing header with per-stage latencies.
+"""
+import argparse
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError as FutureTimeout
+
+from flask import Flask, Response, jsonify, request
+
+from . import metrics
+from .recommend_engine import SCORING_MODES, get_recommender
+from .tweet_nlp import DEFAULT_MODEL_NAME, configure_threads, get_classifier, score_thoughts, select_genres
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class QueueFull(Exception):
+    """Raised when the inference queue is at capacity."""
+
+
+class MicroBatcher:
+    """
+    Collects submitted items into batches for a batch function.
+
+    A worker takes the first waiting item, then keeps collecting until it
+    has max_batch_size items or max_wait_ms has passed, and calls
+    batch_fn(items) once for the whole batch.
+
+    Args:
+        batch_fn (callable): Maps a list of items to a list of results.
+        max_batch_size (int): Largest batch handed to batch_fn.
+        max_wait_ms (float): How long to wait for a batch to fill up.
+        max_queue (int): Pending items allowed before submit() rejects.
+        workers (int): Number of worker threads.
+    """
+
+    def __init__(self, batch_fn, max_batch_size=8, max_wait_ms=10, max_queue=64, workers=1):
+        self.batch_fn = batch_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._threads = [threading.Thread(target=self._run, name=f"inference-{i}", daemon=True)
+                         for i in range(workers)]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, item):
+        """
+        Queue an item for the next batch.
+
+        Returns:
+            Future: Resolves to (result, timings) where timings holds
+            'queue' and 'inference' durations in ms.
+
+        Raises:
+            QueueFull: If max_queue items are already waiting.
+        """
+        future = Future()
+        try:
+            self._queue.put_nowait((item, future, time.perf_counter()))
+        except queue.Full:
+            raise QueueFull("Inference queue is full")
+        return future
+
+    def pending(self):
+        return self._queue.qsize()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.perf_counter() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            started = time.perf_counter()
+            try:
+                results = self.batch_fn([item for item, _, _ in batch])
+            except Exception as e:
+                logger.error(f"Batch of {len(batch)} failed: {e}")
+                for _, future, _ in batch:
+                    future.set_exception(e)
+                continue
+            inference_ms = (time.perf_counter() - started) * 1000
+            for (_, future, queued_at), result in zip(batch, results):
+                future.set_result((result, {'queue': (started - queued_at) * 1000,
+                                            'inference': inference_ms}))
+
+
+def _recommend_options(payload):
+    """Validate the ranking options of a request body; raises ValueError on bad input."""
+    top_k = payload.get('top_k', 5)
+    # bool is an int subclass, but {"top_k": true} is a client bug
+    if not isinstance(top_k, int) or isinstance(top_k, bool) or top_k < 1:
+        raise ValueError("'top_k' must be an integer >= 1")
+    strict = payload.get('strict', True)
+    if not isinstance(strict, bool):
+        raise ValueError("'strict' must be true or false")
+    scoring = payload.get('scoring', 'genre')
+    if scoring not in SCORING_MODES:
+        raise ValueError(f"'scoring' must be one of {', '.join(SCORING_MODES)}")
+    user_id = payload.get('user_id')
+    if user_id is not None and (not isinstance(user_id, int) or isinstance(user_id, bool)):
+        raise ValueError("'user_id' must be an integer")
+    return {'top_k': top_k, 'strict': strict, 'scoring': scoring, 'user_id': user_id}
+
+
+def _server_timing(timings):
+    return ', '.join(f"{stage};dur={duration:.1f}" for stage, duration in timings.items())
+
+
+def create_app(model_name=None, device=None, max_batch_size=8, max_wait_ms=10,
+               max_queue=64, workers=1, request_timeout=30.0, quantize=None):
+    """
+    Build the Flask app and its inference worker pool.
+
+    Args:
+        model_name (str): Zero-shot NLI model id or local path (see get_classifier).
+        device (int): Torch device for the classifier (-1 is CPU, None auto-detects).
+        max_batch_size (int): Texts per batched forward pass.
+        max_wait_ms (float): Time to wait for a batch to fill up.
+        max_queue (int): Pending texts before requests are rejected with 503.
+        workers (int): Inference worker threads.
+        request_timeout (float): Seconds a request waits for inference.
+        quantize (bool): Serve a dynamically int8-quantized copy (CPU only).
+
+    Returns:
+        Flask: The application.
+    """
+    app = Flask(__name__)
+    classifier = get_classifier(model_name, device, quantize)
+    batcher = MicroBatcher(lambda texts: score_thoughts(texts, classifier),
+                           max_batch_size, max_wait_ms, max_queue, workers)
+    app.config['batcher'] = batcher
+
+    def infer_genres(text, threshold, timings):
+        if not text or not isinstance(text, str):
+            raise ValueError("'text' must be a non-empty string")
+        ranked, stage_timings = batcher.submit(text).result(timeout=request_timeout)
+        timings.update(stage_timings)
+        return select_genres(ranked[0], ranked[1], threshold)
+
+    def recommend(genres, payload, timings):
+        started = time.perf_counter()
+        titles = get_recommender().recommend(genres, **_recommend_options(payload))
+        timings['recommend'] = (time.perf_counter() - started) * 1000
+        return titles
+
+    def respond(handler):
+        started = time.perf_counter()
+        timings = {}
+        try:
+            body, status = handler(request.get_json(force=True, silent=True) or {}, timings), 200
+        except QueueFull:
+            metrics.increment('serve_rejected', reason='queue_full')
+            body, status = {'error': "Server busy, retry shortly"}, 503
+        except FutureTimeout:
+            metrics.increment('serve_rejected', reason='timeout')
+            body, status = {'error': "Inference timed out"}, 504
+        except (ValueError, KeyError, TypeError) as e:
+            body, status = {'error': str(e)}, 400
+        timings['total'] = (time.perf_counter() - started) * 1000
+        metrics.observe('serve_request_seconds', timings['total'] / 1000, endpoint=request.path, status=status)
+        response = jsonify(body)
+        response.status_code = status
+        response.headers['Server-Timing'] = _server_timing(timings)
+        if status == 503:
+            response.headers['Retry-After'] = '1'
+        return response
+
+    @app.post('/genres')
+    def genres_endpoint():
+        def handler(payload, timings):
+            genres, scores = infer_genres(payload.get('text'), float(payload.get('threshold', 0.3)), timings)
+            return {'genres': genres, 'scores': scores}
+        return respond(handler)
+
+    @app.post('/recommend')
+    def recommend_endpoint():
+        def handler(payload, timings):
+            genres = payload.get('genres')
+            if not isinstance(genres, (list, dict)):
+                raise ValueError("'genres' must be a list or an object of genre: score")
+            return {'titles': recommend(genres, payload, timings)}
+        return respond(handler)
+
+    @app.post('/thought-to-titles')
+    def thought_to_titles_endpoint():
+        def handler(payload, timings):
+            # Reject bad options before spending an inference slot on the text
+            _recommend_options(payload)
+            genres, scores = infer_genres(payload.get('text'), float(payload.get('threshold', 0.3)), timings)
+            return {'genres': genres, 'scores': scores, 'titles': recommend(scores, payload, timings)}
+        return respond(handler)
+
+    @app.get('/health')
+    def health():
+        return jsonify({'status': 'ok', 'pending': batcher.pending()})
+
+    @app.get('/metrics')
+    def metrics_endpoint():
+        for sink in metrics.sinks():
+            if isinstance(sink, metrics.PrometheusSink):
+                return Response(sink.render(), mimetype='text/plain; version=0.0.4')
+        return jsonify({'error': "Prometheus metrics are not enabled"}), 404
+
+    return app
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the thought-to-title pipeline over HTTP.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--model-name', default=None,
+                        help=f"Model id or local checkpoint path (default: $GENRE_MODEL_NAME or {DEFAULT_MODEL_NAME})")
+    parser.add_argument('--device', type=int, default=None, help="Torch device (-1 for CPU; auto-detected by default)")
+    parser.add_argument('--quantize', action='store_true', help="Use dynamic int8 quantization (CPU only)")
+    parser.add_argument('--threads', type=int, default=None, help="torch intra-op threads")
+    parser.add_argument('--max-batch-size', type=int, default=8)
+    parser.add_argument('--max-wait-ms', type=float, default=10)
+    parser.add_argument('--max-queue', type=int, default=64)
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--metrics', action='store_true', help="Expose Prometheus metrics on /metrics")
+    args = parser.parse_args(argv)
+
+    if args.metrics and not any(isinstance(sink, metrics.PrometheusSink) for sink in metrics.sinks()):
+        metrics.enable(*metrics.sinks(), metrics.PrometheusSink())
+    configure_threads(args.threads)
+    app = create_app(args.model_name, args.device, args.max_batch_size, args.max_wait_ms,
+                     args.max_queue, args.workers, quantize=args.quantize or None)
+    # Load the recommender before accepting traffic
+    get_recommender()
+    app.run(host=args.host, port=args.port, threaded=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,120 +1,528 @@
 # First, ensure you have the library installed:
 # pip install transformers torch
+#
+# torch and transformers are imported inside the functions that need them,
+# so importing this module (e.g. for candidate_genres) stays cheap.
 
-from transformers import pipeline
+import hashlib
+import itertools
 import logging
+import os
+import re
+import threading
+import time
+import numpy as np
+
+from . import metrics
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-def convert_thought_to_genres(thought_text, threshold=0.3, return_scores=False):
+DEFAULT_MODEL_NAME = "facebook/bart-large-mnli"
+HYPOTHESIS_TEMPLATE = "This example is {}."
+EMBEDDING_TEMPERATURE = 0.05  # softmax temperature for embedding-mode scores
+# Default genre inclusion threshold per mode. NLI scores are entailment
+# probabilities; embedding-mode scores are relative to the best label (1.0),
+# so the threshold does not depend on the temperature or the label count.
+DEFAULT_THRESHOLDS = {'nli': 0.3, 'embedding': 0.5}
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(script_dir)
+LABEL_EMBEDDING_CACHE_DIR = os.path.join(project_root, 'models', 'label_embeddings')
+
+# Extended list of movie genres including sub-genres and hybrid genres
+candidate_genres = [
+    # Core Genres
+    'Action', 'Adventure', 'Animation', 'Comedy', 'Crime', 'Documentary',
+    'Drama', 'Fantasy', 'History', 'Horror', 'Mystery', 'Romance',
+    'Sci-Fi', 'Thriller', 'War', 'Western',
+
+    # Sub-genres and Hybrid Genres
+    'Romantic Comedy', 'Action Comedy', 'Horror Comedy', 'Sci-Fi Horror',
+    'Action Thriller', 'Crime Thriller', 'Psychological Thriller',
+    'Supernatural Horror', 'Slasher Horror', 'Psychological Horror',
+    'Historical Drama', 'War Drama', 'Crime Drama', 'Legal Drama',
+    'Superhero Action', 'Martial Arts', 'Heist Film', 'Spy Film',
+    'Disaster Film', 'Mockumentary', 'Biographical Drama',
+
+    # Mood-based Genres
+    'Dark Comedy', 'Black Comedy', 'Satire', 'Parody',
+    'Epic', 'Noir', 'Gothic', 'Melodrama', 'Tragicomedy',
+
+    # Niche/Specific Genres
+    'Musical', 'Sports Drama', 'Teen Comedy', 'Coming of Age',
+    'Family Film', 'Children\'s Film', 'Anime', 'Silent Film',
+    'Road Movie', 'Courtroom Drama', 'Political Thriller'
+]
+
+
+def detect_device():
+    """Return the first CUDA device if one is usable, else -1 (CPU)."""
+    import torch
+    try:
+        return 0 if torch.cuda.is_available() else -1
+    except Exception:
+        return -1
+
+
+def _env_flag(name):
+    return os.environ.get(name, "").lower() in ("1", "true", "yes")
+
+
+def configure_threads(num_threads=None):
+    """
+    Set torch's intra-op CPU thread count.
+
+    Args:
+        num_threads (int): Threads to use (defaults to $GENRE_MODEL_THREADS;
+            leaves torch's default alone if neither is set)
+    """
+    import torch
+    num_threads = num_threads or int(os.environ.get("GENRE_MODEL_THREADS", 0))
+    if num_threads:
+        torch.set_num_threads(num_threads)
+    return torch.get_num_threads()
+
+
+def quantize_classifier(classifier):
+    """Swap the pipeline's model for a dynamically int8-quantized copy (Linear layers only)."""
+    import torch
+    classifier.model = torch.ao.quantization.quantize_dynamic(
+        classifier.model, {torch.nn.Linear}, dtype=torch.qint8
+    )
+    classifier.quantized = True
+    return classifier
+
+
+class ClassifierRegistry:
+    """
+    Process-wide cache of zero-shot classification pipelines.
+
+    Pipelines are created lazily on first use and kept for the lifetime of the
+    process, keyed by (model_name, device, quantize). Creation is guarded by a
+    lock so concurrent callers never load the same model twice.
+
+    model_name may be a Hugging Face model id or a local checkpoint directory
+    (e.g. a smaller NLI model saved with save_pretrained); local directories
+    are read straight from disk, so they work offline.
+    """
+
+    def __init__(self):
+        self._classifiers = {}
+        self._lock = threading.Lock()
+
+    def get(self, model_name=None, device=None, quantize=None):
+        """
+        Return the pipeline for (model_name, device, quantize), loading it if needed.
+
+        Args:
+            model_name (str): Model id or local path (defaults to $GENRE_MODEL_NAME
+                or DEFAULT_MODEL_NAME)
+            device (int): Torch device, -1 for CPU (auto-detected if None)
+            quantize (bool): Apply dynamic int8 quantization to Linear layers;
+                CPU only (defaults to $GENRE_MODEL_QUANTIZE)
+        """
+        model_name = model_name or os.environ.get("GENRE_MODEL_NAME", DEFAULT_MODEL_NAME)
+        device = detect_device() if device is None else device
+        quantize = _env_flag("GENRE_MODEL_QUANTIZE") if quantize is None else quantize
+        if quantize and device != -1:
+            logger.warning("int8 dynamic quantization is CPU-only; loading full precision")
+            quantize = False
+
+        key = (model_name, device, quantize)
+        classifier = self._classifiers.get(key)
+        if classifier is not None:
+            return classifier
+
+        with self._lock:
+            classifier = self._classifiers.get(key)
+            if classifier is None:
+                logger.info(f"Loading zero-shot classifier {model_name} on device {device}"
+                            f"{' (int8)' if quantize else ''}...")
+                from transformers import pipeline
+                with metrics.span('nlp_model_load', model=model_name, quantized=bool(quantize)):
+                    try:
+                        classifier = pipeline("zero-shot-classification", model=model_name, device=device)
+                    except Exception as e:
+                        logger.warning(f"Falling back to CPU: {e}")
+                        metrics.increment('nlp_device_fallback')
+                        classifier = pipeline("zero-shot-classification", model=model_name)
+                    classifier.quantized = False
+                    if quantize:
+                        quantize_classifier(classifier)
+                self._classifiers[key] = classifier
+        return classifier
+
+    def warmup(self, model_name=None, device=None, quantize=None):
+        """Load the pipeline eagerly and run one tiny inference to prime it."""
+        classifier = self.get(model_name, device, quantize)
+        classifier("warmup", candidate_genres[:1])
+        return classifier
+
+    def unload(self, model_name=None, device=None):
+        """
+        Drop cached pipelines so their memory can be reclaimed.
+
+        Args:
+            model_name (str): Only unload this model (all models if None).
+            device (int): Only unload pipelines on this device (all devices if None).
+        """
+        with self._lock:
+            for key in list(self._classifiers):
+                if (model_name is None or key[0] == model_name) and (device is None or key[1] == device):
+                    del self._classifiers[key]
+
+    def loaded(self):
+        """Return the (model_name, device, quantize) keys currently held in memory."""
+        return list(self._classifiers)
+
+
+_registry = ClassifierRegistry()
+
+
+def get_classifier(model_name=None, device=None, quantize=None):
+    """Return the shared zero-shot classifier, loading it on first use."""
+    return _registry.get(model_name, device, quantize)
+
+
+def warmup(model_name=None, device=None, quantize=None):
+    """Load the shared classifier ahead of the first request."""
+    configure_threads()
+    return _registry.warmup(model_name, device, quantize)
+
+
+def unload(model_name=None, device=None):
+    """Release shared classifiers (all of them by default)."""
+    _registry.unload(model_name, device)
+
+
+def encode_texts(texts, classifier=None, batch_size=32):
+    """
+    Encode texts into L2-normalised sentence embeddings.
+
+    Uses the classifier's own encoder (mean-pooled over non-padding tokens),
+    so no second model has to be downloaded or kept in memory.
+
+    Args:
+        texts (list): Strings to encode
+        classifier (Pipeline): Zero-shot pipeline to use (defaults to the shared one)
+        batch_size (int): Number of texts per forward pass
+
+    Returns:
+        np.ndarray: float32 array of shape (len(texts), hidden_size)
+    """
+    import torch
+    if classifier is None:
+        classifier = get_classifier()
+    model, tokenizer = classifier.model, classifier.tokenizer
+    encoder = model.get_encoder() if model.config.is_encoder_decoder else model.base_model
+
+    embeddings = []
+    for start in range(0, len(texts), batch_size):
+        inputs = tokenizer(texts[start:start + batch_size], padding=True, truncation=True,
+                           return_tensors="pt").to(model.device)
+        with torch.no_grad():
+            hidden = encoder(input_ids=inputs["input_ids"],
+                             attention_mask=inputs["attention_mask"]).last_hidden_state
+        mask = inputs["attention_mask"].unsqueeze(-1).to(hidden.dtype)
+        pooled = (hidden * mask).sum(dim=1) / mask.sum(dim=1).clamp(min=1)
+        embeddings.append(torch.nn.functional.normalize(pooled, dim=-1).float().cpu().numpy())
+    return np.concatenate(embeddings) if embeddings else np.empty((0, 0), dtype=np.float32)
+
+
+class LabelEmbeddingIndex:
+    """
+    Precomputed embeddings for a fixed list of candidate labels.
+
+    The bare labels are encoded: wrapped in the NLI hypothesis template,
+    most tokens would be shared by every label and mean pooling would
+    dilute what tells them apart.
+
+    Built once per (model name, label list) and cached both in memory and on
+    disk as a .npy file, so the label side is never re-encoded per request.
+
+    Args:
+        labels (list): Candidate labels, in output order
+        embeddings (np.ndarray): One normalised row per label
+    """
+
+    _cache = {}
+    _lock = threading.Lock()
+
+    def __init__(self, labels, embeddings):
+        self.labels = list(labels)
+        self.embeddings = embeddings
+
+    @staticmethod
+    def cache_key(model_name, labels):
+        """File-safe key: model name plus a hash of the label list."""
+        digest = hashlib.sha1("\n".join(["bare-labels"] + list(labels)).encode("utf-8")).hexdigest()[:12]
+        return f"{re.sub(r'[^A-Za-z0-9_.-]+', '_', model_name)}-{digest}"
+
+    @classmethod
+    def load_or_build(cls, classifier=None, labels=None, cache_dir=LABEL_EMBEDDING_CACHE_DIR):
+        """
+        Return the index for the classifier's model, building it if needed.
+
+        Args:
+            classifier (Pipeline): Zero-shot pipeline to use (defaults to the shared one)
+            labels (list): Candidate labels (defaults to candidate_genres)
+            cache_dir (str): Directory for the on-disk cache (None disables it)
+
+        Returns:
+            LabelEmbeddingIndex: The label index.
+        """
+        if classifier is None:
+            classifier = get_classifier()
+        labels = list(candidate_genres if labels is None else labels)
+        model_name = classifier.model.name_or_path + ("-int8" if getattr(classifier, "quantized", False) else "")
+        key = cls.cache_key(model_name, labels)
+
+        index = cls._cache.get(key)
+        if index is not None:
+            return index
+
+        with cls._lock:
+            index = cls._cache.get(key)
+            if index is not None:
+                return index
+
+            path = os.path.join(cache_dir, key + ".npy") if cache_dir else None
+            if path and os.path.exists(path):
+                embeddings = np.load(path)
+                logger.info(f"Loaded label embeddings from {path}")
+            else:
+                logger.info(f"Encoding {len(labels)} candidate labels...")
+                embeddings = encode_texts(labels, classifier)
+                if path:
+                    os.makedirs(cache_dir, exist_ok=True)
+                    np.save(path, embeddings)
+
+            index = cls(labels, embeddings)
+            cls._cache[key] = index
+        return index
+
+    def score(self, text_embedding):
+        """
+        Similarity of one text embedding to every label, as softmax weights
+        relative to the best label (which scores 1.0).
+        """
+        logits = (self.embeddings @ text_embedding) / EMBEDDING_TEMPERATURE
+        return np.exp(logits - logits.max())
+
+
+def select_genres(labels, scores, threshold):
+    """
+    Keep the labels whose score clears the threshold.
+
+    Args:
+        labels (list): Candidate labels sorted by descending score.
+        scores (list): Scores aligned with labels.
+        threshold (float): Confidence threshold for genre inclusion.
+
+    Returns:
+        tuple: (list of genres, dict of genre:score mappings)
+    """
+    # Filter results based on threshold
+    predicted_genres = []
+    genre_scores = {}
+
+    for label, score in zip(labels, scores):
+        if score > threshold:
+            predicted_genres.append(label)
+            genre_scores[label] = round(score, 3)
+
+    # If no genres meet threshold, return top 2-3 genres
+    if not predicted_genres and scores:
+        metrics.increment('nlp_threshold_fallback')
+        top_indices = sorted(range(len(scores)),
+                             key=lambda i: scores[i], reverse=True)[:3]
+        predicted_genres = [labels[i] for i in top_indices]
+        genre_scores = {labels[i]: round(scores[i], 3) for i in top_indices}
+
+    return predicted_genres, genre_scores
+
+def convert_thought_to_genres(thought_text, threshold=None, return_scores=False, classifier=None, mode="nli"):
     """
     Convert natural language movie descriptions into genre predictions using zero-shot classification.
     
     Args:
         thought_text (str): Natural language description of desired movie
-        threshold (float): Confidence threshold for genre inclusion (0.0 to 1.0)
+        threshold (float): Confidence threshold for genre inclusion (0.0 to 1.0;
+            defaults to DEFAULT_THRESHOLDS[mode])
         return_scores (bool): If True, returns scores along with genres
+        classifier (Pipeline): Zero-shot pipeline to use (defaults to the shared one)
+        mode (str): "nli" runs one entailment pass per candidate genre (most
+            accurate); "embedding" encodes the text once and scores every genre
+            against the cached label embeddings with a single matrix multiply
     
     Returns:
         list: Predicted genres, optionally with confidence scores
     """
     
-    # Initialize the zero-shot classification pipeline
-    try:
-        classifier = pipeline(
-            "zero-shot-classification", 
-            model="facebook/bart-large-mnli",
-            device=0 if hasattr(pipeline, 'device') else -1  # Use GPU if available
-        )
-    except Exception as e:
-        logger.warning(f"Falling back to CPU: {e}")
-        classifier = pipeline("zero-shot-classification", model="facebook/bart-large-mnli")
-
-    # Extended list of movie genres including sub-genres and hybrid genres
-    candidate_genres = [
-        # Core Genres
-        'Action', 'Adventure', 'Animation', 'Comedy', 'Crime', 'Documentary',
-        'Drama', 'Fantasy', 'History', 'Horror', 'Mystery', 'Romance',
-        'Sci-Fi', 'Thriller', 'War', 'Western',
-        
-        # Sub-genres and Hybrid Genres
-        'Romantic Comedy', 'Action Comedy', 'Horror Comedy', 'Sci-Fi Horror',
-        'Action Thriller', 'Crime Thriller', 'Psychological Thriller',
-        'Supernatural Horror', 'Slasher Horror', 'Psychological Horror',
-        'Historical Drama', 'War Drama', 'Crime Drama', 'Legal Drama',
-        'Superhero Action', 'Martial Arts', 'Heist Film', 'Spy Film',
-        'Disaster Film', 'Mockumentary', 'Biographical Drama',
-        
-        # Mood-based Genres
-        'Dark Comedy', 'Black Comedy', 'Satire', 'Parody',
-        'Epic', 'Noir', 'Gothic', 'Melodrama', 'Tragicomedy',
-        
-        # Niche/Specific Genres
-        'Musical', 'Sports Drama', 'Teen Comedy', 'Coming of Age',
-        'Family Film', 'Children\'s Film', 'Anime', 'Silent Film',
-        'Road Movie', 'Courtroom Drama', 'Political Thriller'
-    ]
-
     # Validate input
     if not thought_text or not isinstance(thought_text, str):
         logger.warning("Invalid input: thought_text must be a non-empty string")
+        metrics.increment('nlp_invalid_input')
         return [] if not return_scores else ([], {})
 
-    try:
-        # Perform zero-shot classification
-        logger.info("Analyzing thought for genre prediction...")
-        result = classifier(thought_text, candidate_genres)
-        
-        # Filter results based on threshold
-        predicted_genres = []
-        genre_scores = {}
-        
-        for label, score in zip(result['labels'], result['scores']):
-            if score > threshold:
-                predicted_genres.append(label)
-                genre_scores[label] = round(score, 3)
-        
-        # If no genres meet threshold, return top 2-3 genres
-        if not predicted_genres and result['scores']:
-            top_indices = sorted(range(len(result['scores'])), 
-                               key=lambda i: result['scores'][i], reverse=True)[:3]
-            predicted_genres = [result['labels'][i] for i in top_indices]
-            genre_scores = {result['labels'][i]: round(result['scores'][i], 3) 
-                          for i in top_indices}
-        
-        logger.info(f"Predicted genres: {predicted_genres}")
-        
-        if return_scores:
-            return predicted_genres, genre_scores
-        else:
-            return predicted_genres
-            
-    except Exception as e:
-        logger.error(f"Error in genre prediction: {e}")
-        return [] if not return_scores else ([], {})
+    with metrics.span('nlp_convert', mode=mode):
+        # Reuse the process-wide pipeline instead of loading the model per call
+        if classifier is None:
+            classifier = get_classifier()
+
+        try:
+            # Perform zero-shot classification
+            logger.info("Analyzing thought for genre prediction...")
+            if mode == "embedding":
+                index = LabelEmbeddingIndex.load_or_build(classifier)
+                with metrics.span('nlp_encode'):
+                    embedding = encode_texts([thought_text], classifier)[0]
+                scores = index.score(embedding)
+                order = np.argsort(scores)[::-1]
+                result = {'labels': [index.labels[i] for i in order], 'scores': scores[order].tolist()}
+            elif mode == "nli":
+                # The pipeline tokenizes and runs one entailment pass per label
+                with metrics.span('nlp_classify'):
+                    result = classifier(thought_text, candidate_genres)
+            else:
+                raise ValueError(f"Unknown mode: {mode}")
 
-def get_genre_confidence_scores(thought_text, threshold=0.3):
+            if threshold is None:
+                threshold = DEFAULT_THRESHOLDS[mode]
+            predicted_genres, genre_scores = select_genres(result['labels'], result['scores'], threshold)
+
+            logger.info(f"Predicted genres: {predicted_genres}")
+
+            if return_scores:
+                return predicted_genres, genre_scores
+            else:
+                return predicted_genres
+
+        except Exception as e:
+            logger.error(f"Error in genre prediction: {e}")
+            metrics.increment('nlp_errors', mode=mode)
+            return [] if not return_scores else ([], {})
+
+def get_genre_confidence_scores(thought_text, threshold=None, mode="nli"):
     """
     Convenience function to get both genres and their confidence scores.
     
     Args:
         thought_text (str): Natural language description of desired movie
-        threshold (float): Confidence threshold for genre inclusion
+        threshold (float): Confidence threshold for genre inclusion (defaults per mode)
+        mode (str): "nli" or "embedding" (see convert_thought_to_genres)
     
     Returns:
         tuple: (list of genres, dict of genre:score mappings)
     """
-    return convert_thought_to_genres(thought_text, threshold, return_scores=True)
+    return convert_thought_to_genres(thought_text, threshold, return_scores=True, mode=mode)
+
+def _entailment_id(model):
+    """Index of the entailment logit in an NLI model's output."""
+    for label, idx in model.config.label2id.items():
+        if label.lower().startswith("entail"):
+            return idx
+    return -1
+
+def score_thoughts(texts, classifier=None):
+    """
+    Score a list of texts against every candidate genre in one forward pass.
+
+    Args:
+        texts (list): Texts to score; invalid entries (empty or non-string)
+            are skipped and come back as None
+        classifier (Pipeline): Zero-shot pipeline to use (defaults to the shared one)
+
+    Returns:
+        list: For each text, (labels, scores) sorted by descending score, or None
+    """
+    import torch
+    if classifier is None:
+        classifier = get_classifier()
+    model, tokenizer = classifier.model, classifier.tokenizer
+    hypotheses = [HYPOTHESIS_TEMPLATE.format(genre) for genre in candidate_genres]
+    num_labels = len(hypotheses)
+    valid = [text for text in texts if text and isinstance(text, str)]
+
+    scores = []
+    if valid:
+        metrics.observe('nlp_batch_size', len(valid))
+        premises = [text for text in valid for _ in range(num_labels)]
+        with metrics.span('nlp_tokenize'):
+            inputs = tokenizer(premises, hypotheses * len(valid), padding=True,
+                               truncation="only_first", return_tensors="pt").to(model.device)
+        with metrics.span('nlp_forward'), torch.no_grad():
+            logits = model(**inputs).logits[:, _entailment_id(model)]
+        # Same normalisation as the pipeline: softmax over the candidate labels
+        scores = logits.reshape(len(valid), num_labels).softmax(dim=-1).tolist()
+
+    scores = iter(scores)
+    results = []
+    for text in texts:
+        if not text or not isinstance(text, str):
+            results.append(None)
+            continue
+        ranked = sorted(zip(candidate_genres, next(scores)), key=lambda pair: pair[1], reverse=True)
+        results.append(([label for label, _ in ranked], [score for _, score in ranked]))
+    return results
+
+def convert_thoughts_to_genres(texts, batch_size=8, threshold=0.3, return_scores=False, classifier=None):
+    """
+    Batched version of convert_thought_to_genres for scoring many texts.
+
+    Texts are consumed lazily from the iterable. Each batch of texts is
+    expanded into (text, hypothesis) pairs for every candidate genre,
+    padded, and sent through the NLI model in a single forward pass.
+    Throughput is logged once the iterable is exhausted.
+
+    Args:
+        texts (iterable): Natural language descriptions (e.g. a tweet dump)
+        batch_size (int): Number of texts per forward pass; each text adds
+            len(candidate_genres) pairs to the batch
+        threshold (float): Confidence threshold for genre inclusion (0.0 to 1.0)
+        return_scores (bool): If True, yields scores along with genres
+        classifier (Pipeline): Zero-shot pipeline to use (defaults to the shared one)
+
+    Yields:
+        list: Predicted genres for each input text, in input order,
+        optionally with confidence scores
+    """
+    if classifier is None:
+        classifier = get_classifier()
+
+    texts = iter(texts)
+    num_texts = 0
+    start = time.perf_counter()
+
+    while True:
+        batch = list(itertools.islice(texts, batch_size))
+        if not batch:
+            break
+
+        for ranked in score_thoughts(batch, classifier):
+            if ranked is None:
+                logger.warning("Invalid input: thought_text must be a non-empty string")
+                result = ([], {})
+            else:
+                result = select_genres(ranked[0], ranked[1], threshold)
+            yield result if return_scores else result[0]
+        num_texts += len(batch)
+
+    elapsed = time.perf_counter() - start
+    if num_texts:
+        logger.info(f"Scored {num_texts} texts in {elapsed:.2f}s ({num_texts / elapsed:.1f} texts/sec)")
 
 # --- Enhanced Example Usage ---
 
 if __name__ == "__main__":
+    # Load the model once up front; every example below reuses it
+    warmup()
+
     # Example 1: A thought about a futuristic action movie
     thought1 = "I want to see something with spaceships, laser battles, and a lone hero fighting against a galactic empire."
-    genres1 = convert_thought_to_genres(thought1)
-    genres1_with_scores, scores1 = get_genre_confidence_scores(thought1)
+    genres1, scores1 = get_genre_confidence_scores(thought1)
     
     print("🎬 Example 1: Futuristic Action Movie")
     print(f"Thought: \"{thought1}\"")
@@ -124,8 +532,7 @@ if __name__ == "__main__":
 
     # Example 2: A thought about a light-hearted story
     thought2 = "I'm in the mood for something funny and sweet, maybe about two people falling in love against the odds."
-    genres2 = convert_thought_to_genres(thought2)
-    genres2_with_scores, scores2 = get_genre_confidence_scores(thought2)
+    genres2, scores2 = get_genre_confidence_scores(thought2)
     
     print("💕 Example 2: Romantic Comedy")
     print(f"Thought: \"{thought2}\"")
@@ -135,8 +542,7 @@ if __name__ == "__main__":
 
     # Example 3: A thought about a tense, scary movie
     thought3 = "I want to watch a movie that will keep me on the edge of my seat, with a shocking twist at the end and maybe a ghost."
-    genres3 = convert_thought_to_genres(thought3)
-    genres3_with_scores, scores3 = get_genre_confidence_scores(thought3)
+    genres3, scores3 = get_genre_confidence_scores(thought3)
     
     print("👻 Example 3: Psychological Horror/Thriller")
     print(f"Thought: \"{thought3}\"")
@@ -146,8 +552,7 @@ if __name__ == "__main__":
 
     # Example 4: Complex hybrid genre
     thought4 = "I want to see martial arts action mixed with comedy, like kung fu but hilarious."
-    genres4 = convert_thought_to_genres(thought4, threshold=0.25)
-    genres4_with_scores, scores4 = get_genre_confidence_scores(thought4, threshold=0.25)
+    genres4, scores4 = get_genre_confidence_scores(thought4, threshold=0.25)
     
     print("🥋 Example 4: Martial Arts Comedy")
     print(f"Thought: \"{thought4}\"")
@@ -157,10 +562,20 @@ if __name__ == "__main__":
 
     # Example 5: Niche genre
     thought5 = "I'm looking for a mockumentary style comedy about everyday office life."
-    genres5 = convert_thought_to_genres(thought5)
-    genres5_with_scores, scores5 = get_genre_confidence_scores(thought5)
+    genres5, scores5 = get_genre_confidence_scores(thought5)
     
     print("🏢 Example 5: Mockumentary Comedy")
     print(f"Thought: \"{thought5}\"")
     print(f"Predicted Genres: {genres5}")
-    print(f"Genres with Scores: {dict(list(scores5.items())[:5])}")  # Top 5
\ No newline at end of file
+    print(f"Genres with Scores: {dict(list(scores5.items())[:5])}")  # Top 5
+    print("-" * 50)
+
+    # Example 6: Batch scoring a small tweet dump
+    tweets = [
+        "Just watched a mind-bending sci-fi movie!",
+        "I love intense drama and thrillers.",
+        "Looking for some light-hearted comedy."
+    ]
+    print("🐦 Example 6: Batched Tweets")
+    for tweet, genres in zip(tweets, convert_thoughts_to_genres(tweets, batch_size=2)):
+        print(f"Tweet: \"{tweet}\" -> {genres}")
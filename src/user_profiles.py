@@ -0,0 +1,314 @@
+"""
+Per-user profiles for personalised re-ranking.
+
+A profile store is built offline from ratings.csv against a model built by
+src.build_model (it needs the model's movie_ids) and holds, per user:
+
+- affinity: an L2-normalised vector over the model's genre columns, the
+  sum of the user's rated items' genre vectors weighted by how much the
+  user liked each item relative to their own mean (plus EXPOSURE_WEIGHT
+  for simply having watched it)
+- seen: the items the user has rated, kept as the structure of a CSR
+  user x item rating matrix (a sparse bitset; the ratings themselves are
+  kept so re-ratings can be applied exactly)
+- bias: the user's mean rating minus the global mean
+
+Profiles are indexed by userId through a dense lookup array, so resolving a
+user is one array read. Appended rating events are folded in with
+update(): only the affected users' rows are recomputed, and the full
+ratings CSV is never re-read.
+
+The store is saved like a model artifact: versioned directories of .npy
+files plus a JSON manifest behind a CURRENT pointer (see src.model_store),
+memory-mapped on load.
+
+Usage:
+    python -m src.user_profiles build --model models/genre_to_title_model --output models/user_profiles
+    python -m src.user_profiles update new_ratings.csv --model models/genre_to_title_model
+"""
+import argparse
+import json
+import logging
+import os
+import time
+
+import numpy as np
+from scipy import sparse
+
+from . import metrics
+from .model_store import DEFAULT_MODEL_PATH, current_version, load_model, new_version, publish_version
+
+logger = logging.getLogger(__name__)
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(script_dir)
+DEFAULT_PROFILE_PATH = os.path.join(project_root, 'models', 'user_profiles')
+
+PROFILE_FORMAT = 'thought-to-title-profiles'
+PROFILE_VERSION = 1
+MANIFEST_NAME = 'manifest.json'
+# Weight of "watched it at all" next to the mean-centred rating
+EXPOSURE_WEIGHT = 0.5
+
+
+def _item_vectors(model_components):
+    """Item genre vectors and movie_ids of a model, checking it has movie_ids."""
+    movie_ids = model_components.get('movie_ids')
+    if movie_ids is None:
+        raise ValueError("Model has no movie_ids; rebuild it with src.build_model")
+    return model_components['normalized_matrix'], np.asarray(movie_ids)
+
+
+class UserProfileStore:
+    """
+    Genre affinities, seen items and rating biases for every known user.
+
+    Build one with build_profiles() or open one with load_profiles().
+
+    Args:
+        user_ids (np.ndarray): userId of each profile row.
+        ratings (scipy.sparse.csr_matrix): User x item ratings, items in
+            model row order.
+        affinity (np.ndarray): float32 (n_users, n_columns) genre affinities.
+        bias (np.ndarray): float32 per-user mean rating minus the global mean.
+        movie_ids (np.ndarray): movieIds in model row order.
+        rating_sum (float): Sum of all ratings (for the global mean).
+        version (int): Incremented by every update().
+    """
+
+    def __init__(self, user_ids, ratings, affinity, bias, movie_ids, rating_sum, version=0):
+        self.user_ids = np.asarray(user_ids, dtype=np.int64)
+        self.ratings = ratings
+        self.affinity = affinity
+        self.bias = bias
+        self.movie_ids = movie_ids
+        self.rating_sum = float(rating_sum)
+        self.version = version
+        self._index_users()
+
+    def _index_users(self):
+        size = int(self.user_ids.max()) + 1 if len(self.user_ids) else 0
+        self.user_index = np.full(size, -1, dtype=np.int32)
+        self.user_index[self.user_ids] = np.arange(len(self.user_ids), dtype=np.int32)
+
+    def __len__(self):
+        return len(self.user_ids)
+
+    @property
+    def global_mean(self):
+        return self.rating_sum / self.ratings.nnz if self.ratings.nnz else 0.0
+
+    def row(self, user_id):
+        """Profile row of a userId, or None for an unknown user."""
+        if 0 <= user_id < len(self.user_index):
+            row = self.user_index[user_id]
+            if row >= 0:
+                return int(row)
+        return None
+
+    def seen(self, row):
+        """Sorted model rows of the items a profile row has rated."""
+        return self.ratings.indices[self.ratings.indptr[row]:self.ratings.indptr[row + 1]]
+
+    def _recompute(self, rows, item_vectors):
+        """Recompute affinity and bias for the given profile rows."""
+        subset = self.ratings[rows]
+        counts = np.diff(subset.indptr)
+        means = np.asarray(subset.sum(axis=1)).ravel() / np.maximum(counts, 1)
+
+        weights = subset.astype(np.float64)
+        weights.data -= np.repeat(means, counts)
+        weights.data += EXPOSURE_WEIGHT
+        affinity = np.asarray((weights @ item_vectors).todense())
+        norms = np.linalg.norm(affinity, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+
+        self.affinity[rows] = affinity / norms
+        self.bias[rows] = np.where(counts > 0, means - self.global_mean, 0.0)
+
+    def update(self, events, item_vectors):
+        """
+        Fold appended rating events into the profiles.
+
+        A later event for the same (user, movie) replaces the earlier rating.
+        Only the users named in events are recomputed; the other users'
+        biases are shifted by the change in the global mean.
+
+        Args:
+            events (pd.DataFrame): userId, movieId and rating columns.
+            item_vectors (scipy.sparse.csr_matrix): The model's row-normalised
+                genre matrix (normalized_matrix from load_model).
+
+        Returns:
+            int: Number of profiles touched (new users included).
+        """
+        start = time.perf_counter()
+        movie_ids = events['movieId'].to_numpy()
+        order = np.argsort(self.movie_ids, kind='stable')
+        positions = np.minimum(np.searchsorted(self.movie_ids, movie_ids, sorter=order), len(order) - 1)
+        item_rows = order[positions]
+        known = self.movie_ids[item_rows] == movie_ids
+        if not known.all():
+            logger.warning(f"Skipping {int((~known).sum())} events for movies not in the model")
+        user_ids = events['userId'].to_numpy(dtype=np.int64)[known]
+        item_rows = item_rows[known]
+        values = events['rating'].to_numpy(dtype=np.float32)[known]
+        if len(user_ids) == 0:
+            return 0
+
+        new_users = np.setdiff1d(user_ids, self.user_ids)
+        if len(new_users):
+            self.user_ids = np.concatenate([self.user_ids, new_users])
+            self.ratings = sparse.csr_matrix(sparse.vstack(
+                [self.ratings, sparse.csr_matrix((len(new_users), self.ratings.shape[1]), dtype=np.float32)]))
+            self.affinity = np.vstack([self.affinity, np.zeros((len(new_users), self.affinity.shape[1]),
+                                                               dtype=np.float32)])
+            self.bias = np.concatenate([self.bias, np.zeros(len(new_users), dtype=np.float32)])
+            self._index_users()
+
+        rows = self.user_index[user_ids]
+        # Last event per (user, movie) wins: dedupe on the reversed order
+        keys = rows.astype(np.int64) * self.ratings.shape[1] + item_rows
+        _, last = np.unique(keys[::-1], return_index=True)
+        last = len(keys) - 1 - last
+        rows, item_rows, values = rows[last], item_rows[last], values[last]
+
+        patch = sparse.csr_matrix((values, (rows, item_rows)), shape=self.ratings.shape)
+        pattern = sparse.csr_matrix((np.ones(len(rows), dtype=np.float32), (rows, item_rows)),
+                                    shape=self.ratings.shape)
+        replaced = self.ratings.multiply(pattern)
+        old_mean = self.global_mean
+        # Copy the memory-mapped arrays on first write
+        self.affinity = np.array(self.affinity)
+        self.bias = np.array(self.bias)
+        self.ratings = sparse.csr_matrix(self.ratings - replaced + patch, dtype=np.float32)
+        self.ratings.eliminate_zeros()
+        self.rating_sum += float(values.sum()) - float(replaced.sum())
+        self.bias[np.diff(self.ratings.indptr) > 0] += old_mean - self.global_mean
+
+        touched = np.unique(rows)
+        self._recompute(touched, item_vectors)
+        self.version += 1
+        metrics.increment('profile_updates', len(touched))
+        logger.info(f"Updated {len(touched)} profiles ({len(new_users)} new) from {len(values)} events "
+                    f"in {time.perf_counter() - start:.2f}s")
+        return len(touched)
+
+    def save(self, path):
+        """Write the store as a new version of a directory of .npy files plus a JSON manifest."""
+        tmp_path = new_version(os.path.abspath(path))
+
+        arrays = {
+            'user_ids': self.user_ids,
+            'movie_ids': self.movie_ids,
+            'affinity': self.affinity,
+            'bias': self.bias,
+            'ratings.data': self.ratings.data,
+            'ratings.indices': self.ratings.indices,
+            'ratings.indptr': self.ratings.indptr,
+        }
+        for name, array in arrays.items():
+            np.save(os.path.join(tmp_path, f'{name}.npy'), np.ascontiguousarray(array), allow_pickle=False)
+        with open(os.path.join(tmp_path, MANIFEST_NAME), 'w') as f:
+            json.dump({'format': PROFILE_FORMAT, 'profile_version': PROFILE_VERSION,
+                       'written_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                       'shape': list(self.ratings.shape), 'rating_sum': self.rating_sum,
+                       'exposure_weight': EXPOSURE_WEIGHT, 'version': self.version,
+                       'files': {name: {'file': f'{name}.npy'} for name in arrays}}, f, indent=1)
+
+        # Publish only once complete, so a running recommender never reads a half-written store
+        publish_version(os.path.abspath(path), tmp_path)
+
+
+def build_profiles(ratings, model_components):
+    """
+    Build profiles for every user in a ratings frame.
+
+    Args:
+        ratings (pd.DataFrame): userId, movieId and rating columns.
+        model_components (dict): Model from load_model (needs movie_ids).
+
+    Returns:
+        UserProfileStore: The profiles.
+    """
+    from .collaborative import build_rating_matrix
+
+    start = time.perf_counter()
+    item_vectors, movie_ids = _item_vectors(model_components)
+    matrix, user_ids = build_rating_matrix(ratings, movie_ids)
+    matrix = sparse.csr_matrix(matrix, dtype=np.float32)
+    store = UserProfileStore(
+        user_ids, matrix,
+        affinity=np.zeros((matrix.shape[0], item_vectors.shape[1]), dtype=np.float32),
+        bias=np.zeros(matrix.shape[0], dtype=np.float32),
+        movie_ids=movie_ids,
+        rating_sum=float(matrix.data.sum()),
+    )
+    store._recompute(np.arange(len(store)), item_vectors)
+    logger.info(f"Built {len(store)} user profiles from {matrix.nnz} ratings "
+                f"in {time.perf_counter() - start:.2f}s")
+    return store
+
+
+def profiles_mtime(path):
+    """Modification time (ns) that changes whenever a store is rewritten."""
+    return os.stat(os.path.join(current_version(path), MANIFEST_NAME)).st_mtime_ns
+
+
+def load_profiles(path=DEFAULT_PROFILE_PATH, mmap_mode='r'):
+    """
+    Open a store written by UserProfileStore.save; arrays are memory-mapped
+    by default and copied on the first update().
+
+    Returns:
+        UserProfileStore: The profiles.
+    """
+    path = current_version(path)
+    with open(os.path.join(path, MANIFEST_NAME)) as f:
+        manifest = json.load(f)
+    if manifest.get('format') != PROFILE_FORMAT:
+        raise ValueError(f"{path} is not a user profile store")
+    if manifest.get('profile_version', 0) > PROFILE_VERSION:
+        raise ValueError(f"Profile store version {manifest['profile_version']} is newer than this code "
+                         f"supports ({PROFILE_VERSION})")
+
+    def array(name):
+        return np.asarray(np.load(os.path.join(path, f'{name}.npy'), mmap_mode=mmap_mode, allow_pickle=False))
+
+    ratings = sparse.csr_matrix((array('ratings.data'), array('ratings.indices'), array('ratings.indptr')),
+                                shape=tuple(manifest['shape']), copy=False)
+    return UserProfileStore(array('user_ids'), ratings, array('affinity'), array('bias'), array('movie_ids'),
+                            manifest['rating_sum'], version=manifest.get('version', 0))
+
+
+def main(argv=None):
+    from .data_loader import DEFAULT_RATINGS_PATH, load_ratings
+
+    parser = argparse.ArgumentParser(description="Build or update the per-user profile store.")
+    parser.add_argument('--model', default=DEFAULT_MODEL_PATH, help="Model artifact built by src.build_model")
+    parser.add_argument('--output', default=DEFAULT_PROFILE_PATH, help="Profile store directory")
+    commands = parser.add_subparsers(dest='command', required=True)
+    build = commands.add_parser('build', help="Build profiles from the full ratings CSV")
+    build.add_argument('--ratings', default=DEFAULT_RATINGS_PATH, help="Path to ratings.csv")
+    update = commands.add_parser('update', help="Fold appended rating events into an existing store")
+    update.add_argument('events', help="CSV of new rating events (userId, movieId, rating[, timestamp])")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    model_components = load_model(args.model)
+    if args.command == 'build':
+        store = build_profiles(load_ratings(args.ratings), model_components)
+    else:
+        item_vectors, movie_ids = _item_vectors(model_components)
+        store = load_profiles(args.output)
+        if not np.array_equal(store.movie_ids, movie_ids):
+            logger.error("Profiles were built against a different model; rebuild them")
+            return 1
+        store.update(load_ratings(args.events), item_vectors)
+    store.save(args.output)
+    logger.info(f"Wrote {len(store)} profiles to {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -1,9 +1,17 @@
-from sklearn.metrics.pairwise import cosine_similarity
-import numpy as np
+from .item_index import ExactIndex
 
-def get_top_n_similar(tweet_vec, movie_vectors, movie_df, n=10):
-    """Returns top N similar movies based on cosine similarity"""
-    sims = cosine_similarity([tweet_vec], movie_vectors)[0]
-    movie_df = movie_df.copy()
-    movie_df['similarity'] = sims
-    return movie_df.sort_values(by='similarity', ascending=False).head(n)
+
+def get_top_n_similar(tweet_vec, movie_vectors, movie_df, n=10, index=None):
+    """
+    Returns top N similar movies based on cosine similarity.
+
+    Only the N best rows of movie_df are copied, with a 'similarity' column
+    added. Pass a prebuilt index (see src.item_index) to skip normalising
+    movie_vectors on every call or to use the approximate LSH backend.
+    """
+    if index is None:
+        index = ExactIndex(movie_vectors)
+    indices, scores = index.query(tweet_vec, k=n)
+    top = movie_df.iloc[indices[0]].copy()
+    top['similarity'] = scores[0]
+    return top
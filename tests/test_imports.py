@@ -0,0 +1,51 @@
+"""
+`import src` must stay light: the NLP stack (torch, transformers) is only
+loaded when genre inference is actually used, and the package itself loads
+no submodule, so `python -m src.<module>` CLIs run their module only once.
+
+Each statement runs in a fresh interpreter, so imports made by other tests
+cannot hide a regression.
+"""
+import subprocess
+import sys
+
+import pytest
+
+from benchmarks.check_imports import imported_modules, project_root
+
+HEAVY_MODULES = ('torch', 'transformers')
+
+
+@pytest.mark.parametrize('statement', [
+    'import src',
+    'import src.recommend_engine',
+    'import src.serve',
+])
+def test_import_does_not_load_nlp_stack(statement):
+    assert imported_modules(statement, HEAVY_MODULES) == []
+
+
+def test_lazy_attribute_resolves():
+    assert imported_modules('import src; src.load_and_preprocess_data', HEAVY_MODULES) == []
+
+
+def test_import_src_loads_no_submodule():
+    assert imported_modules('import src', ('src.recommend_engine', 'src.model_store', 'src.metrics')) == []
+
+
+@pytest.mark.parametrize('statement', [
+    'import src',
+    'import src.recommend_engine',
+    'from src.recommend_engine import GenreRecommender',
+])
+def test_recommend_engine_attribute_is_the_function(statement):
+    code = f"{statement}\nimport src, types\nassert isinstance(src.recommend_engine, types.FunctionType)"
+    subprocess.run([sys.executable, '-c', code], cwd=project_root, check=True)
+
+
+@pytest.mark.parametrize('module', ['src.model_store', 'src.user_profiles'])
+def test_cli_module_runs_once(module):
+    result = subprocess.run([sys.executable, '-W', 'error::RuntimeWarning', '-m', module, '--help'],
+                            cwd=project_root, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+    assert 'found in sys.modules' not in result.stderr
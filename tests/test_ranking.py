@@ -0,0 +1,152 @@
+"""
+Ranking and incremental-update checks against brute force, on the shipped
+model and the bundled MovieLens files.
+
+GenreRecommender ranks row groups (genre scoring) or merged posting lists
+(hybrid scoring) and never scores the whole catalogue; these tests score
+every row densely and check that the returned rows carry the best scores.
+"""
+import numpy as np
+import pytest
+
+from src.content_model import TagContentModel
+from src.data_loader import load_ratings, load_tags
+from src.model_store import DEFAULT_MODEL_PATH, load_model
+from src.recommend_engine import CENTROID_SIZE, GenreRecommender
+from src.user_profiles import build_profiles
+
+QUERIES = [
+    ['Action', 'Adventure'],
+    ['Comedy', 'Romance'],
+    ['Horror', 'Thriller', 'Mystery'],
+    ['Sci-Fi'],
+    ['Crime', 'Drama', 'Film-Noir'],
+    ['Documentary', 'IMAX'],
+    {'Action': 0.9, 'Sci-Fi Horror': 0.4},
+]
+
+
+@pytest.fixture(scope='module')
+def model_components():
+    return load_model(DEFAULT_MODEL_PATH)
+
+
+@pytest.fixture(scope='module')
+def recommender(model_components, tmp_path_factory):
+    profile_path = str(tmp_path_factory.mktemp('profiles'))
+    build_profiles(load_ratings(), model_components).save(profile_path)
+    return GenreRecommender(DEFAULT_MODEL_PATH, cache_size=0, profile_path=profile_path)
+
+
+def _hybrid_scores(recommender, cosine, candidates):
+    """
+    Genre cosine blended with the collaborative score: cosine to the
+    confidence-weighted centroid of the best genre matches (ties at the
+    cut-off by row), scaled by confidence.
+    """
+    state = recommender._state
+    factors, confidence = state.item_factors, state.confidence
+    top = candidates[np.lexsort((candidates, -cosine[candidates]))[:CENTROID_SIZE]]
+    centroid = (cosine[top] * confidence[top]) @ factors[top]
+    collaborative = confidence * (factors @ (centroid / np.linalg.norm(centroid)) + 1.0) / 2.0
+    collaborative[~factors.any(axis=1)] = 0.0
+    weight = recommender.hybrid_weight
+    return (1.0 - weight) * cosine + weight * collaborative
+
+
+def reference_scores(recommender, genres, scoring, user_id=None):
+    """
+    Dense scores of every row, and the rows that match any query genre
+    (minus the user's rated titles when personalised).
+    """
+    state = recommender._state
+    query, _ = state.build_query(genres)
+    cosine = state.normalized_matrix @ (query / np.linalg.norm(query))
+    candidates = np.flatnonzero(cosine > 0)
+    scores = cosine if scoring == 'genre' else _hybrid_scores(recommender, cosine, candidates)
+    if user_id is None:
+        return scores, candidates, None
+    profiles = recommender.profiles
+    row = profiles.row(user_id)
+    weight = recommender.personal_weight
+    scores = (1.0 - weight) * scores + weight * (state.normalized_matrix @ profiles.affinity[row])
+    seen = profiles.seen(row)
+    return scores, np.setdiff1d(candidates, seen), seen
+
+
+@pytest.mark.parametrize('user_id', [None, 414])
+@pytest.mark.parametrize('scoring', ['genre', 'hybrid'])
+@pytest.mark.parametrize('strict', [True, False])
+@pytest.mark.parametrize('top_k', [1, 5, 50])
+@pytest.mark.parametrize('genres', QUERIES, ids=str)
+def test_rank_rows_matches_brute_force(recommender, genres, strict, scoring, top_k, user_id):
+    rows = recommender.rank_rows(genres, top_k=top_k, strict=strict, scoring=scoring, user_id=user_id)
+    scores, candidates, seen = reference_scores(recommender, genres, scoring, user_id)
+    valid = np.arange(len(scores)) if seen is None else np.setdiff1d(np.arange(len(scores)), seen)
+
+    assert len(rows) == min(top_k, len(candidates) if strict else len(valid))
+    assert len(np.unique(rows)) == len(rows)
+    if seen is not None:
+        assert not np.isin(rows, seen).any()
+    if strict or scoring == 'hybrid':
+        # Hybrid loose mode ranks the matches first as well
+        assert np.isin(rows[:len(candidates)], candidates).all()
+        expected = np.sort(scores[candidates])[::-1][:top_k]
+    else:
+        expected = np.sort(scores[valid])[::-1][:top_k]
+    np.testing.assert_allclose(scores[rows[:len(expected)]], expected, rtol=0, atol=1e-6)
+
+
+@pytest.mark.parametrize('scoring', ['genre', 'hybrid'])
+def test_loose_mode_fills_shortfall_with_other_titles(recommender, scoring):
+    genres = ['Film-Noir']
+    scores, candidates, _ = reference_scores(recommender, genres, scoring)
+    top_k = len(candidates) + 10
+    rows = recommender.rank_rows(genres, top_k=top_k, strict=False, scoring=scoring)
+
+    assert len(rows) == top_k
+    assert len(np.unique(rows)) == top_k
+    assert set(rows[:len(candidates)]) == set(candidates)
+    assert not np.isin(rows[len(candidates):], candidates).any()
+    if scoring == 'hybrid':
+        # Hybrid fills in catalogue order (genre mode by row group)
+        others = np.setdiff1d(np.arange(len(scores)), candidates)
+        np.testing.assert_array_equal(rows[len(candidates):], others[:10])
+
+
+def test_random_fallbacks_are_not_cached():
+    recommender = GenreRecommender(DEFAULT_MODEL_PATH, cache_size=16)
+    for _ in range(3):
+        assert len(recommender.recommend(['Not A Genre'], top_k=5)) == 5
+    assert len(recommender.cache) == 0
+
+    recommender.recommend(['Comedy'], top_k=5)
+    assert len(recommender.cache) == 1
+
+
+def test_profile_update_matches_full_build(model_components):
+    ratings = load_ratings().sort_values('timestamp', kind='stable')
+    split = int(len(ratings) * 0.9)
+    full = build_profiles(ratings, model_components)
+    incremental = build_profiles(ratings.iloc[:split], model_components)
+    incremental.update(ratings.iloc[split:], model_components['normalized_matrix'])
+
+    assert len(incremental) == len(full)
+    assert incremental.global_mean == pytest.approx(full.global_mean)
+    for user_id in full.user_ids:
+        expected, actual = full.row(int(user_id)), incremental.row(int(user_id))
+        np.testing.assert_allclose(incremental.affinity[actual], full.affinity[expected], atol=1e-6)
+        assert incremental.bias[actual] == pytest.approx(full.bias[expected], abs=1e-6)
+        np.testing.assert_array_equal(np.sort(incremental.seen(actual)), np.sort(full.seen(expected)))
+
+
+def test_tag_update_matches_fit(model_components):
+    tags = load_tags()
+    split = int(len(tags) * 0.8)
+    movie_ids, genre_matrix = model_components['movie_ids'], model_components['genre_matrix']
+    full = TagContentModel(movie_ids, genre_matrix).fit(tags)
+    incremental = TagContentModel(movie_ids, genre_matrix).fit(tags.iloc[:split])
+    incremental.update(tags.iloc[split:])
+
+    assert (incremental.tag_counts != full.tag_counts).nnz == 0
+    assert (incremental.content_matrix != full.content_matrix).nnz == 0